@@ -1,13 +1,36 @@
 import os
 import shutil
 import json
+import atexit
+import sqlite3
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from flask.cli import load_dotenv
 import google.generativeai as genai
 from werkzeug.utils import secure_filename
 import logging
+import threading
+import time
+import queue
+import random
+import re
+import select
+import struct
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import mmap
+import uuid
+import base64
+import bisect
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process locks, but also no multi-process servers
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
 
@@ -20,29 +43,2796 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 DOWNLOADS_PATH = os.getenv('DOWNLOADS_PATH', os.path.abspath('./downloads/'))
 SUMMARY_FILE = os.path.join(DOWNLOADS_PATH, 'organization_summary.json')
+SUMMARY_JOURNAL_FILE = os.path.join(DOWNLOADS_PATH, 'organization_summary.jsonl')
+# The journal is fsynced after this many appends or this many seconds, whichever comes first
+JOURNAL_FSYNC_EVERY = int(os.getenv('JOURNAL_FSYNC_EVERY', '32'))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', '1.0'))
+# Rewrite the journal once this many lines have been appended since the last compaction
+JOURNAL_COMPACT_EVERY = int(os.getenv('JOURNAL_COMPACT_EVERY', '10000'))
+# Organize pipeline: move workers, concurrent AI description workers and walker queue depth
+ORGANIZE_WORKERS = int(os.getenv('ORGANIZE_WORKERS', str(min(32, (os.cpu_count() or 1) * 4))))
+AI_CONCURRENCY = int(os.getenv('AI_CONCURRENCY', '4'))
+ORGANIZE_QUEUE_SIZE = int(os.getenv('ORGANIZE_QUEUE_SIZE', '256'))
+# Background AI enrichment: model calls per second, retries and base backoff in seconds
+AI_RATE_LIMIT = float(os.getenv('AI_RATE_LIMIT', '2'))
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '3'))
+AI_RETRY_BACKOFF = float(os.getenv('AI_RETRY_BACKOFF', '1.0'))
+# Describe up to this many operations per model call, waiting at most this long to fill a batch
+AI_BATCH_SIZE = int(os.getenv('AI_BATCH_SIZE', '20'))
+AI_BATCH_WAIT_MS = int(os.getenv('AI_BATCH_WAIT_MS', '250'))
+# Operation history backend: 'sqlite' (default) or 'jsonl'
+HISTORY_BACKEND = os.getenv('HISTORY_BACKEND', 'sqlite').lower()
+HISTORY_DB_FILE = os.path.join(DOWNLOADS_PATH, 'organization_history.db')
+# Persistent cache of AI descriptions: entry cap (0 disables the cache) and time-to-live in seconds
+AI_CACHE_FILE = os.path.join(DOWNLOADS_PATH, 'ai_description_cache.db')
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '10000'))
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', str(30 * 24 * 3600)))
+# Directory snapshot used by incremental organize runs, and whether /organize is incremental by default
+SNAPSHOT_FILE = os.path.join(DOWNLOADS_PATH, 'organize_snapshot.json')
+ORGANIZE_INCREMENTAL = os.getenv('ORGANIZE_INCREMENTAL', 'false').lower() in ('1', 'true', 'yes')
+# Watch mode: organize files as they land, after this debounce delay, through a bounded queue
+WATCH_MODE = os.getenv('WATCH_MODE', 'false').lower() in ('1', 'true', 'yes')
+WATCH_DEBOUNCE_MS = int(os.getenv('WATCH_DEBOUNCE_MS', '500'))
+WATCH_QUEUE_SIZE = int(os.getenv('WATCH_QUEUE_SIZE', '1024'))
+WATCH_WORKERS = int(os.getenv('WATCH_WORKERS', '2'))
+# Optional JSON file of user-defined categories ({"category": [".ext", ...]}), hot-reloaded on change
+CATEGORY_RULES_FILE = os.getenv('CATEGORY_RULES_FILE', os.path.abspath('./category_rules.json'))
+CATEGORY_RULES_CHECK_INTERVAL = float(os.getenv('CATEGORY_RULES_CHECK_INTERVAL', '2.0'))
+# Re-read a category folder's names after this many seconds to notice files removed externally
+DESTINATION_INDEX_TTL = float(os.getenv('DESTINATION_INDEX_TTL', '300'))
+# Duplicate detection: 'off' (default), 'link' (hard-link to the existing copy), 'skip' (leave in place)
+# or 'quarantine' (move into the duplicates folder). Files smaller than DEDUP_MIN_SIZE bytes are ignored
+DEDUP_MODE = os.getenv('DEDUP_MODE', 'off').lower()
+DEDUP_MIN_SIZE = int(os.getenv('DEDUP_MIN_SIZE', '1'))
+DUPLICATES_FOLDER = 'duplicates'
+# Undo journals of applied organize plans, and each process's write-ahead log of in-flight moves
+BATCHES_FOLDER = 'organize_batches'
+INTENTS_FOLDER = 'organize_intents'
+# Persistent content hashes used by duplicate detection, and how often stale rows are purged (seconds, 0 = never)
+FINGERPRINT_DB_FILE = os.path.join(DOWNLOADS_PATH, 'file_fingerprints.db')
+FINGERPRINT_COMPACT_INTERVAL = float(os.getenv('FINGERPRINT_COMPACT_INTERVAL', '3600'))
+# Background organize jobs: finished jobs kept for /jobs, and error messages kept per job
+ORGANIZE_JOBS_KEEP = int(os.getenv('ORGANIZE_JOBS_KEEP', '50'))
+ORGANIZE_JOB_MAX_ERRORS = int(os.getenv('ORGANIZE_JOB_MAX_ERRORS', '100'))
+# Seconds between saves of a running job's progress to the shared state
+JOB_STATUS_INTERVAL = float(os.getenv('JOB_STATUS_INTERVAL', '0.5'))
+# Live /events feed: events buffered per client before it is told to resync, and keep-alive interval
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '1000'))
+EVENTS_KEEPALIVE = float(os.getenv('EVENTS_KEEPALIVE', '15'))
+# Seconds between checks of the shared history for changes made by other worker processes
+EVENTS_SHARED_POLL = float(os.getenv('EVENTS_SHARED_POLL', '1'))
+# Seconds between full recounts of the cached /stats counters (0 = only count on demand)
+STATS_RECONCILE_INTERVAL = float(os.getenv('STATS_RECONCILE_INTERVAL', '60'))
+# Seconds the /files listing is cached when no organize operation invalidates it
+FILES_CACHE_TTL = float(os.getenv('FILES_CACHE_TTL', '2'))
+# Dry-run organize plans kept for review and later application
+ORGANIZE_PLANS_KEEP = int(os.getenv('ORGANIZE_PLANS_KEEP', '20'))
+# Whether organize runs cut short by a crash are resumed on startup
+RESUME_INTERRUPTED_RUNS = os.getenv('RESUME_INTERRUPTED_RUNS', 'true').lower() in ('1', 'true', 'yes')
+# Shared state for multi-process servers: job progress and plans, and the cross-process lock files
+# electing the process that runs background services and serializing organize runs
+STATE_DB_FILE = os.path.join(DOWNLOADS_PATH, 'organize_state.db')
+LEADER_LOCK_FILE = os.path.join(DOWNLOADS_PATH, 'organizer.lock')
+ORGANIZE_LOCK_FILE = os.path.join(DOWNLOADS_PATH, 'organize_run.lock')
+# Seconds a SQLite connection waits for another process's write to finish
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '30'))
+# Files kept in the downloads folder by the organizer itself
+RESERVED_FILES = {
+    os.path.basename(SUMMARY_FILE),
+    os.path.basename(SUMMARY_FILE) + '.migrated',
+    os.path.basename(SUMMARY_JOURNAL_FILE),
+    os.path.basename(SUMMARY_JOURNAL_FILE) + '.tmp',
+    os.path.basename(SUMMARY_JOURNAL_FILE) + '.migrated',
+    os.path.basename(SNAPSHOT_FILE),
+    os.path.basename(SNAPSHOT_FILE) + '.tmp',
+    os.path.basename(LEADER_LOCK_FILE),
+    os.path.basename(ORGANIZE_LOCK_FILE),
+}
+# SQLite databases come with WAL and shared-memory side files
+for _db_file in (HISTORY_DB_FILE, AI_CACHE_FILE, FINGERPRINT_DB_FILE, STATE_DB_FILE):
+    RESERVED_FILES.update(os.path.basename(_db_file) + suffix for suffix in ('', '-wal', '-shm'))
+if os.path.dirname(os.path.abspath(CATEGORY_RULES_FILE)) == os.path.abspath(DOWNLOADS_PATH):
+    RESERVED_FILES.add(os.path.basename(CATEGORY_RULES_FILE))
+
+# --- Gemini AI Initialization ---
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+    model = genai.GenerativeModel('gemini-2.5-flash')
+    logger.info("Gemini AI initialized successfully")
+else:
+    logger.warning("Gemini API key not found. AI features will be disabled.")
+    model = None
+
+# File type mappings
+FILE_CATEGORIES = {
+    'images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.tiff'],
+    'documents': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'],
+    'spreadsheets': ['.xls', '.xlsx', '.csv', '.ods', '.numbers'],
+    'presentations': ['.ppt', '.pptx', '.odp', '.key'],
+    'videos': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'],
+    'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'],
+    'archives': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz', '.tar.gz', '.tar.bz2', '.tar.xz', '.tgz'],
+    'executables': ['.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm', '.appimage'],
+    'code': ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.php', '.rb', '.go'],
+    'fonts': ['.ttf', '.otf', '.woff', '.woff2', '.eot']
+}
+
+class CategoryRules:
+    """
+    Extension-to-category lookup compiled into a single dict.
+    Built from FILE_CATEGORIES plus an optional JSON rules file of the same shape
+    ({"category": [".ext", ...]}), whose entries override the defaults. Multi-part
+    suffixes such as '.tar.gz' are supported. The rules file is re-read when its
+    mtime changes, checked at most every CATEGORY_RULES_CHECK_INTERVAL seconds.
+    A category removed from the rules file keeps its folder pruned from scans, since the
+    files already organized there must not be filed again.
+    """
+    def __init__(self, defaults, rules_path=None):
+        self.defaults = defaults
+        self.rules_path = rules_path
+        self._lock = threading.Lock()
+        # Every category folder files may have been organized into, including retired ones
+        self._filed_into = set()
+        self._rules_mtime = None
+        self._next_check = 0.0
+        self._compile({})
+        self.maybe_reload(force=True)
+
+    def _compile(self, user_rules):
+        """
+        Build the lookup table and swap it in with a single assignment.
+        """
+        by_extension = {}
+        for source in (self.defaults, user_rules):
+            for category, extensions in source.items():
+                for extension in extensions:
+                    extension = extension.lower()
+                    if not extension.startswith('.'):
+                        extension = '.' + extension
+                    by_extension[extension] = category
+        categories = list(self.defaults) + [c for c in user_rules if c not in self.defaults]
+        self._filed_into.update(categories)
+        self._table = (
+            by_extension,
+            max((ext.count('.') for ext in by_extension), default=1),
+            tuple(categories),
+            frozenset(self._filed_into) | {'others', DUPLICATES_FOLDER, BATCHES_FOLDER, INTENTS_FOLDER}
+        )
+
+    def remember(self, categories):
+        """
+        Keep pruning the folders of `categories`, e.g. every category found in the history,
+        even if they are no longer defined by the rules.
+        """
+        with self._lock:
+            self._filed_into.update(c for c in categories if c and secure_filename(c) == c)
+            self._table = self._table[:3] + (self._table[3] | frozenset(self._filed_into),)
+
+    def _load_user_rules(self):
+        with open(self.rules_path, 'r') as f:
+            raw = json.load(f)
+        rules = {}
+        for category, extensions in raw.items():
+            if not category or secure_filename(category) != category or not isinstance(extensions, list):
+                logger.warning(f"Ignoring invalid category rule: {category!r}")
+                continue
+            rules[category] = [str(extension) for extension in extensions]
+        return rules
+
+    def maybe_reload(self, force=False):
+        """
+        Re-read the rules file if it changed since it was last loaded.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + CATEGORY_RULES_CHECK_INTERVAL
+            try:
+                mtime = os.stat(self.rules_path).st_mtime_ns if self.rules_path else None
+            except OSError:
+                mtime = None
+            if mtime == self._rules_mtime and not force:
+                return
+            try:
+                user_rules = self._load_user_rules() if mtime is not None else {}
+                self._compile(user_rules)
+                self._rules_mtime = mtime
+                if user_rules:
+                    logger.info(f"Loaded {len(user_rules)} category rules from {self.rules_path}")
+            except Exception as e:
+                logger.error(f"Error loading category rules: {e}")
+
+    @property
+    def categories(self):
+        """
+        Known category names, defaults first, excluding 'others'.
+        """
+        self.maybe_reload()
+        return self._table[2]
+
+    @property
+    def category_dirs(self):
+        """
+        Top-level folders the organizer files into; these are never rescanned.
+        """
+        self.maybe_reload()
+        return self._table[3]
+
+    def split(self, filename):
+        """
+        Split a filename into (stem, extension, category), matching the longest known suffix.
+        Unknown extensions fall back to os.path.splitext and the 'others' category.
+        """
+        self.maybe_reload()
+        by_extension, max_parts, _, _ = self._table
+        lowered = filename.lower()
+        # Candidate suffix start positions, longest first; a leading dot marks a hidden file, not a suffix
+        positions = []
+        index = len(lowered)
+        while len(positions) < max_parts:
+            index = lowered.rfind('.', 1, index)
+            if index <= 0:
+                break
+            positions.append(index)
+        for index in reversed(positions):
+            category = by_extension.get(lowered[index:])
+            if category is not None:
+                return filename[:index], filename[index:], category
+        stem, ext = os.path.splitext(filename)
+        return stem, ext, 'others'
+
+    def classify(self, filename):
+        """
+        Return the category for a filename, or 'others'.
+        """
+        return self.split(filename)[2]
+
+category_rules = CategoryRules(FILE_CATEGORIES, CATEGORY_RULES_FILE)
+
+
+class NameCleaner:
+    """
+    Turns a file stem into a short, meaningful name by dropping the noise download sites add:
+    tokens that look like hashes or UUID parts, dates and other numbers, and short hex ids.
+    Tokens are split on whitespace, underscores and hyphens and lowercased, then joined with '_'.
+    If every token is noise, the stem up to its first underscore is kept as is.
+    """
+    # On a lowercased ASCII stem, matches exactly the tokens to keep in a single pass: a token start
+    # (nothing but a separator before it) not followed by a whole-token digit run, alphanumeric run
+    # of 8+ characters or hex run of 4+ characters
+    KEEP = re.compile(r'(?<![^\s_-])(?!(?:[0-9]+|[a-z0-9]{8,}|[0-9a-f]{4,})(?![^\s_-]))[^\s_-]+')
+    HEX_DIGITS = '0123456789abcdefABCDEF'
+
+    def _clean_unicode(self, name):
+        # Non-ASCII stems use str predicates, whose Unicode digit and letter rules regexes don't mirror
+        hex_digits = self.HEX_DIGITS
+        kept = [part.lower() for part in name.replace('_', ' ').replace('-', ' ').split()
+                if not (part.isdigit() or (len(part) >= 8 and part.isalnum()) or
+                        (len(part) >= 4 and not part.strip(hex_digits)))]
+        return '_'.join(kept) if kept else name.split('_')[0]
+
+    def clean(self, name):
+        """
+        Clean a single stem (the filename without its extension).
+        """
+        if not name.isascii():
+            return self._clean_unicode(name)
+        kept = self.KEEP.findall(name.lower())
+        return '_'.join(kept) if kept else name.split('_')[0]
+
+    def clean_many(self, names):
+        """
+        Clean a list of stems in one pass, returning the results in the same order.
+        """
+        keep = self.KEEP.findall
+        clean_unicode = self._clean_unicode
+        cleaned = []
+        append = cleaned.append
+        for name in names:
+            if not name.isascii():
+                append(clean_unicode(name))
+                continue
+            kept = keep(name.lower())
+            append('_'.join(kept) if kept else name.split('_')[0])
+        return cleaned
+
+name_cleaner = NameCleaner()
+
+def iter_unorganized_files(root):
+    """
+    Yield paths of files under `root` that still need organizing, using os.scandir.
+    Category folders directly under `root` are pruned before they are entered, and
+    directory entries are classified from their d_type, so skipping an organized tree
+    costs one directory entry rather than a walk over its contents.
+    """
+    skip_dirs = category_rules.category_dirs
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        files = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if current == root and entry.name in skip_dirs:
+                            continue
+                        stack.append(entry.path)
+                    elif entry.is_file() and entry.name not in RESERVED_FILES:
+                        files.append(entry.path)
+        except OSError as e:
+            if current == root:
+                raise
+            logger.warning(f"Skipping unreadable folder {current}: {e}")
+            continue
+        # Yield only after the directory handle is closed, since workers move files out of it
+        yield from files
+
+
+class HistoryStore:
+    """
+    Base class for operation history backends.
+    Entries are plain dicts as produced by FileOrganizer.organize_file; each stored entry gets an integer 'id'.
+    """
+    def append(self, entry):
+        """
+        Record a single entry and return its id.
+        """
+        raise NotImplementedError
+
+    def recent(self, limit=None):
+        """
+        Return entries most recent first, optionally limited to the newest `limit`.
+        """
+        raise NotImplementedError
+
+    def query(self, limit=None, before=None, after=None, category=None, action=None,
+              since=None, until=None, search=None):
+        """
+        Return matching entries most recent first. `before`/`after` are entry ids bounding the page
+        (exclusive); with only `after`, the `limit` entries immediately following it are returned.
+        `since`/`until` are inclusive ISO timestamps and `search` is a case-insensitive substring
+        of the original name, new name or AI description.
+        """
+        raise NotImplementedError
+
+    def update(self, entry_id, fields):
+        """
+        Merge `fields` into an existing entry.
+        """
+        raise NotImplementedError
+
+    def pending(self, limit=None):
+        """
+        Return entries whose AI description is still pending, oldest first.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """
+        Return the total number of recorded entries.
+        """
+        raise NotImplementedError
+
+    def has_move(self, original_path, new_path):
+        """
+        Return True if a move from `original_path` to `new_path` is already recorded.
+        """
+        raise NotImplementedError
+
+    def latest(self, original_path, action):
+        """
+        Return the most recent entry for `original_path` with the given action, or None.
+        """
+        raise NotImplementedError
+
+    def exists(self):
+        """
+        Return True if the backend already holds data on disk.
+        """
+        raise NotImplementedError
+
+    def categories(self):
+        """
+        Return the distinct categories of all recorded entries.
+        """
+        raise NotImplementedError
+
+    def external_version(self):
+        """
+        Return a value that changes whenever another process writes to the history, or None
+        if the backend is never shared between processes.
+        """
+        return None
+
+    def sync(self):
+        """
+        Flush buffered writes to disk. No-op by default.
+        """
+
+    def close(self):
+        """
+        Flush and release any resources held by the backend.
+        """
+        self.sync()
+
+
+class JsonlHistoryStore(HistoryStore):
+    """
+    Append-only JSON-Lines journal backing the organization summary.
+    Each action is written as a single line, fsyncs are batched, and the file is compacted periodically.
+    Existing entries are only replayed from disk the first time they are needed.
+    Entry ids are their 1-based position in the journal. Updates are appended as
+    '_update' records and folded into their entries on replay and compaction.
+    """
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._entries = None
+        self._handle = None
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self._appended_since_compact = 0
+
+    def _replay(self):
+        """
+        Read the legacy JSON summary (if any) followed by every journal line.
+        Returns the entries and the number of damaged lines that were skipped.
+        """
+        entries = []
+        damaged = 0
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            with open(self.legacy_path, 'r') as f:
+                entries.extend(json.load(f))
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Typically a torn final line left behind by a crash mid-write
+                        damaged += 1
+                        continue
+                    target = record.pop('_update', None)
+                    if target is None:
+                        record['id'] = len(entries) + 1
+                        entries.append(record)
+                    elif 0 < target <= len(entries):
+                        entries[target - 1].update(record)
+        for position, entry in enumerate(entries, start=1):
+            entry['id'] = position
+        return entries, damaged
+
+    @property
+    def entries(self):
+        """
+        All recorded entries in insertion order, replayed from disk on first access.
+        """
+        with self._lock:
+            if self._entries is None:
+                try:
+                    self._entries, damaged = self._replay()
+                    logger.info(f"Replayed {len(self._entries)} entries from summary journal")
+                    if damaged:
+                        logger.warning(f"Skipped {damaged} damaged journal lines")
+                    if damaged or (self.legacy_path and os.path.exists(self.legacy_path)):
+                        self.compact()
+                except Exception as e:
+                    logger.error(f"Error loading summary: {e}")
+                    self._entries = []
+            return self._entries
+
+    def exists(self):
+        """
+        Return True if there is any summary data on disk.
+        """
+        return os.path.exists(self.path) or bool(self.legacy_path and os.path.exists(self.legacy_path))
+
+    def append(self, entry):
+        """
+        Append a single entry to the journal and return its id.
+        The line is flushed immediately, but only fsynced once per batch.
+        """
+        with self._lock:
+            entry = dict(entry, id=len(self.entries) + 1)
+            self._entries.append(entry)
+            self._write_record(entry)
+            return entry['id']
+
+    def update(self, entry_id, fields):
+        with self._lock:
+            entries = self.entries
+            if not 0 < entry_id <= len(entries):
+                raise KeyError(entry_id)
+            entries[entry_id - 1].update(fields)
+            self._write_record(dict(fields, _update=entry_id))
+
+    def _write_record(self, record):
+        """
+        Append one line to the journal, fsyncing and compacting when the batch thresholds are reached.
+        Must be called with the lock held.
+        """
+        if self._handle is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._handle = open(self.path, 'a', encoding='utf-8')
+        self._handle.write(json.dumps(record, default=str) + '\n')
+        self._handle.flush()
+        self._pending_sync += 1
+        self._appended_since_compact += 1
+        if (self._pending_sync >= JOURNAL_FSYNC_EVERY or
+                time.monotonic() - self._last_sync >= JOURNAL_FSYNC_INTERVAL):
+            self.sync()
+        if self._appended_since_compact >= JOURNAL_COMPACT_EVERY:
+            self.compact()
+
+    def pending(self, limit=None):
+        entries = [entry for entry in self.entries if entry.get('ai_status') == 'pending']
+        return entries[:limit] if limit else entries
+
+    def recent(self, limit=None):
+        entries = self.entries
+        if limit:
+            entries = entries[-limit:]
+        return entries[::-1]
+
+    def query(self, limit=None, before=None, after=None, category=None, action=None,
+              since=None, until=None, search=None):
+        # No index here: a linear scan from the newest (or, after a cursor, the oldest) end
+        needle = search.lower() if search else None
+        entries = self.entries
+        start = min(len(entries), before - 1) if before is not None else len(entries)
+        stop = max(0, after) if after is not None else 0
+        positions = range(start - 1, stop - 1, -1)
+        if after is not None and before is None:
+            positions = range(stop, start)
+        matches = []
+        for position in positions:
+            entry = entries[position]
+            timestamp = entry.get('timestamp') or ''
+            if ((category and entry.get('category') != category) or
+                    (action and entry.get('action') != action) or
+                    (since and timestamp < since) or (until and timestamp > until)):
+                continue
+            if needle and not any(needle in (entry.get(field) or '').lower()
+                                  for field in ('original_name', 'new_name', 'ai_description')):
+                continue
+            matches.append(entry)
+            if limit and len(matches) >= limit:
+                break
+        if after is not None and before is None:
+            matches.reverse()
+        return matches
+
+    def count(self):
+        return len(self.entries)
+
+    def has_move(self, original_path, new_path):
+        return any(entry.get('original_path') == original_path and entry.get('new_path') == new_path
+                   for entry in reversed(self.entries))
+
+    def categories(self):
+        return {entry.get('category') for entry in self.entries} - {None}
+
+    def latest(self, original_path, action):
+        return next((dict(entry) for entry in reversed(self.entries)
+                     if entry.get('original_path') == original_path and entry.get('action') == action), None)
+
+    def sync(self):
+        with self._lock:
+            if self._handle is not None and self._pending_sync:
+                os.fsync(self._handle.fileno())
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+
+    def compact(self):
+        """
+        Rewrite the journal as one clean line per entry, dropping damaged lines and
+        folding in updates and the legacy JSON summary. The swap is atomic.
+        """
+        with self._lock:
+            entries = self.entries
+            tmp_path = self.path + '.tmp'
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            os.replace(tmp_path, self.path)
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                os.remove(self.legacy_path)
+                logger.info(f"Migrated legacy summary into journal: {self.path}")
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+            self._appended_since_compact = 0
+            logger.info(f"Summary journal compacted to {len(entries)} entries")
+
+
+class SqliteHistoryStore(HistoryStore):
+    """
+    SQLite-backed operation history in WAL mode.
+    Entries are rows indexed by timestamp, category and original path, so reading
+    the newest N entries is an indexed O(N) query and nothing is held in memory.
+    """
+    COLUMNS = ('timestamp', 'action', 'original_name', 'new_name', 'original_path',
+               'new_path', 'category', 'ai_description', 'ai_status')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                     timeout=SQLITE_BUSY_TIMEOUT)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                action TEXT,
+                original_name TEXT,
+                new_name TEXT,
+                original_path TEXT,
+                new_path TEXT,
+                category TEXT,
+                ai_description TEXT,
+                ai_status TEXT,
+                extra TEXT
+            );
+        """)
+        # Databases created before a column was introduced get it added in place
+        existing = {row['name'] for row in self._conn.execute('PRAGMA table_info(history)')}
+        for column in self.COLUMNS:
+            if column not in existing:
+                self._conn.execute(f'ALTER TABLE history ADD COLUMN {column} TEXT')
+        self._conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+            CREATE INDEX IF NOT EXISTS idx_history_category ON history(category);
+            CREATE INDEX IF NOT EXISTS idx_history_original_path ON history(original_path);
+            CREATE INDEX IF NOT EXISTS idx_history_action ON history(action);
+            CREATE INDEX IF NOT EXISTS idx_history_pending ON history(id) WHERE ai_status = 'pending';
+        """)
+        self._fts = self._create_search_index()
+
+    def _create_search_index(self):
+        """
+        Maintain a trigram full-text index over names and descriptions for substring search.
+        Returns False (search falls back to LIKE scans) if this SQLite build lacks FTS5 trigrams.
+        """
+        try:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'").fetchone()
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                    original_name, new_name, ai_description,
+                    content='history', content_rowid='id', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+                    INSERT INTO history_fts(rowid, original_name, new_name, ai_description)
+                    VALUES (new.id, new.original_name, new.new_name, new.ai_description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, original_name, new_name, ai_description)
+                    VALUES ('delete', old.id, old.original_name, old.new_name, old.ai_description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_fts_update
+                AFTER UPDATE OF original_name, new_name, ai_description ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, original_name, new_name, ai_description)
+                    VALUES ('delete', old.id, old.original_name, old.new_name, old.ai_description);
+                    INSERT INTO history_fts(rowid, original_name, new_name, ai_description)
+                    VALUES (new.id, new.original_name, new.new_name, new.ai_description);
+                END;
+            """)
+            if not exists:
+                # Index rows recorded before the search index existed
+                self._conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search unavailable, falling back to scans: {e}")
+            return False
+
+    def _to_row(self, entry):
+        extra = {k: v for k, v in entry.items() if k not in self.COLUMNS and k != 'id'}
+        values = [entry.get(column) for column in self.COLUMNS]
+        values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+        values[0] = values[0] or datetime.now().isoformat()
+        values.append(json.dumps(extra, default=str) if extra else None)
+        return values
+
+    def _to_entry(self, row):
+        entry = {column: row[column] for column in self.COLUMNS}
+        if row['extra']:
+            entry.update(json.loads(row['extra']))
+        entry['id'] = row['id']
+        return entry
+
+    def append(self, entry):
+        placeholders = ', '.join('?' * (len(self.COLUMNS) + 1))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT INTO history ({', '.join(self.COLUMNS)}, extra) VALUES ({placeholders})",
+                self._to_row(entry))
+            return cursor.lastrowid
+
+    def update(self, entry_id, fields):
+        columns = {k: v for k, v in fields.items() if k in self.COLUMNS}
+        extra = {k: v for k, v in fields.items() if k not in self.COLUMNS and k != 'id'}
+        with self._lock:
+            if extra:
+                row = self._conn.execute('SELECT extra FROM history WHERE id = ?', (entry_id,)).fetchone()
+                if row is None:
+                    raise KeyError(entry_id)
+                merged = json.loads(row['extra']) if row['extra'] else {}
+                merged.update(extra)
+                columns['extra'] = json.dumps(merged, default=str)
+            if not columns:
+                return
+            assignments = ', '.join(f'{column} = ?' for column in columns)
+            cursor = self._conn.execute(f'UPDATE history SET {assignments} WHERE id = ?',
+                                        [*columns.values(), entry_id])
+            if cursor.rowcount == 0:
+                raise KeyError(entry_id)
+
+    def pending(self, limit=None):
+        query = "SELECT * FROM history WHERE ai_status = 'pending' ORDER BY id"
+        params = ()
+        if limit:
+            query += ' LIMIT ?'
+            params = (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def extend(self, entries):
+        """
+        Insert many entries in a single transaction. Used for migrations.
+        """
+        placeholders = ', '.join('?' * (len(self.COLUMNS) + 1))
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO history ({', '.join(self.COLUMNS)}, extra) VALUES ({placeholders})",
+                    (self._to_row(entry) for entry in entries))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def recent(self, limit=None):
+        query = 'SELECT * FROM history ORDER BY id DESC'
+        params = ()
+        if limit:
+            query += ' LIMIT ?'
+            params = (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def query(self, limit=None, before=None, after=None, category=None, action=None,
+              since=None, until=None, search=None):
+        conditions = []
+        params = []
+        for condition, value in (('id < ?', before), ('id > ?', after), ('category = ?', category),
+                                 ('action = ?', action), ('timestamp >= ?', since), ('timestamp <= ?', until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if search:
+            # Trigrams need at least three characters; shorter terms use a LIKE scan
+            if self._fts and len(search) >= 3:
+                conditions.append('id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)')
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append("(original_name LIKE ? ESCAPE '\\' OR new_name LIKE ? ESCAPE '\\' "
+                                  "OR ai_description LIKE ? ESCAPE '\\')")
+                params.extend([pattern] * 3)
+        # Paging forward from an 'after' cursor walks up from it, then flips to newest first
+        forward = after is not None and before is None
+        query = 'SELECT * FROM history'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id ' + ('ASC' if forward else 'DESC')
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        entries = [self._to_entry(row) for row in rows]
+        if forward:
+            entries.reverse()
+        return entries
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def has_move(self, original_path, new_path):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM history WHERE original_path = ? AND new_path = ? LIMIT 1',
+                                      (original_path, new_path)).fetchone() is not None
+
+    def latest(self, original_path, action):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM history WHERE original_path = ? AND action = ? '
+                                     'ORDER BY id DESC LIMIT 1', (original_path, action)).fetchone()
+        return self._to_entry(row) if row else None
+
+    def exists(self):
+        return self.count() > 0
+
+    def categories(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute(
+                'SELECT DISTINCT category FROM history WHERE category IS NOT NULL')}
+
+    def external_version(self):
+        # Changes only when another connection commits, never for our own writes
+        with self._lock:
+            return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_legacy_history(store):
+    """
+    One-shot migration of the JSON summary and JSONL journal into a SQLite store.
+    Runs only while the store is empty; migrated files are renamed with a '.migrated' suffix.
+    Returns the number of migrated entries.
+    """
+    legacy_files = [path for path in (SUMMARY_FILE, SUMMARY_JOURNAL_FILE) if os.path.exists(path)]
+    if not legacy_files or store.exists():
+        return 0
+    entries, damaged = JsonlHistoryStore(SUMMARY_JOURNAL_FILE, legacy_path=SUMMARY_FILE)._replay()
+    if damaged:
+        logger.warning(f"Skipped {damaged} damaged journal lines during migration")
+    store.extend(entries)
+    for path in legacy_files:
+        os.replace(path, path + '.migrated')
+    logger.info(f"Migrated {len(entries)} history entries into {store.path}")
+    return len(entries)
+
+
+def create_history_store():
+    """
+    Build the history backend selected by HISTORY_BACKEND.
+    """
+    if HISTORY_BACKEND == 'jsonl':
+        return JsonlHistoryStore(SUMMARY_JOURNAL_FILE, legacy_path=SUMMARY_FILE)
+    if HISTORY_BACKEND != 'sqlite':
+        logger.warning(f"Unknown history backend '{HISTORY_BACKEND}', falling back to sqlite")
+    return SqliteHistoryStore(HISTORY_DB_FILE)
+
+class DirectorySnapshot:
+    """
+    Persisted view of the downloads tree as of the last incremental organize run.
+    Each directory is stored as [mtime_ns, inode, subdirectories, {file name: [size, mtime_ns, inode]}].
+    A directory whose mtime and inode are unchanged gained or lost no entries, so it is not listed
+    again; its recorded subdirectories are visited directly. Only files that are new or whose size,
+    mtime or inode changed are reported. Files rewritten in place inside an otherwise unchanged
+    directory are not noticed until the directory itself changes.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.dirs = {}
+        # Held for the duration of a scan so concurrent runs don't interleave snapshot updates
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        Load the snapshot from disk, starting empty if it is missing or unreadable.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.dirs = json.load(f).get('dirs', {})
+            logger.info(f"Loaded directory snapshot with {len(self.dirs)} directories")
+        except Exception as e:
+            logger.error(f"Error loading directory snapshot: {e}")
+            self.dirs = {}
+
+    def save(self):
+        """
+        Atomically write the snapshot to disk.
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'dirs': self.dirs}, f)
+        os.replace(tmp_path, self.path)
+
+    def scan(self, root, skip_dirs):
+        """
+        Yield paths of files under `root` that are new or changed since the snapshot was taken.
+        Top-level directories named in `skip_dirs` are never entered. The snapshot is replaced
+        with the observed state only once the generator has been fully consumed.
+        """
+        new_dirs = {}
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                st = os.stat(current)
+            except OSError:
+                continue
+            previous = self.dirs.get(current)
+            if previous and previous[0] == st.st_mtime_ns and previous[1] == st.st_ino:
+                new_dirs[current] = previous
+                stack.extend(os.path.join(current, name) for name in previous[2])
+                continue
+            old_files = previous[3] if previous else {}
+            subdirs = []
+            files = {}
+            changed = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if current == root and entry.name in skip_dirs:
+                                continue
+                            subdirs.append(entry.name)
+                        elif entry.is_file() and entry.name not in RESERVED_FILES:
+                            fst = entry.stat()
+                            state = [fst.st_size, fst.st_mtime_ns, fst.st_ino]
+                            files[entry.name] = state
+                            if old_files.get(entry.name) != state:
+                                changed.append(entry.path)
+            except OSError as e:
+                if current == root:
+                    raise
+                logger.warning(f"Skipping unreadable folder {current}: {e}")
+                # Keep what we knew about it, so the next run compares against that again
+                if previous:
+                    new_dirs[current] = previous
+                    stack.extend(os.path.join(current, name) for name in previous[2])
+                continue
+            stack.extend(os.path.join(current, name) for name in subdirs)
+            new_dirs[current] = [st.st_mtime_ns, st.st_ino, subdirs, files]
+            yield from changed
+        self.dirs = new_dirs
+
+    def forget(self, path):
+        """
+        Drop a file reported by the last scan that was not handled after all (its move failed),
+        so the next scan lists its folder again and reports it as new. Call with the lock held.
+        """
+        entry = self.dirs.get(os.path.dirname(path))
+        if entry is not None:
+            entry[0] = None
+            entry[3].pop(os.path.basename(path), None)
+
+
+_libc = None
+
+class ProcessLock:
+    """
+    Exclusive lock shared by the threads of this process and, through flock() on `path`, by every
+    other process opening the same file. The kernel drops the lock if its holder dies.
+    Without fcntl (Windows) it only excludes threads, which is enough for a single process.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BaseException:
+                os.close(fd)
+                raise
+        except BlockingIOError:
+            self._thread_lock.release()
+            return False
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def load_libc():
+    """
+    Load the C library once for ctypes-based syscalls (inotify, renameat2).
+    """
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    return _libc
+
+
+class Inotify:
+    """
+    Minimal ctypes binding to Linux inotify.
+    """
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        self._libc = load_libc()
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+    def add_watch(self, path, mask):
+        """
+        Watch `path` for the events in `mask` and return the watch descriptor.
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        return wd
+
+    def read_events(self, timeout):
+        """
+        Wait up to `timeout` seconds and return a list of (wd, mask, name) tuples.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        buffer = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self.EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DownloadsWatcher:
+    """
+    Organizes files as they land in the downloads folder, without rescanning the tree.
+    Every non-category folder is watched with inotify. A file is only considered finished once it
+    is closed after writing or renamed into place, and is organized WATCH_DEBOUNCE_MS after its last
+    such event. Finished files flow through a bounded queue to a small pool of organize workers.
+    In-progress browser downloads (.crdownload, .part, ...) are ignored until they are renamed.
+    """
+    FILE_EVENTS = Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO
+    DIR_EVENTS = Inotify.IN_CREATE | Inotify.IN_MOVED_TO | Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF
+    PARTIAL_SUFFIXES = ('.crdownload', '.part', '.partial', '.download', '.tmp')
+
+    def __init__(self, organizer):
+        self.organizer = organizer
+        self.inotify = None
+        self._watches = {}
+        self._due = {}
+        self._queue = queue.Queue(maxsize=WATCH_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.organized = 0
+        self.errors = 0
+        self.overflows = 0
+
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self):
+        """
+        Start watching. Returns False if inotify is not available on this platform.
+        """
+        if self.running:
+            return True
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            logger.warning(f"Watch mode unavailable: {e}")
+            return False
+        self._stop.clear()
+        self._watch_tree(DOWNLOADS_PATH)
+        self._threads = [threading.Thread(target=self._read_loop, name='watcher', daemon=True)]
+        self._threads += [threading.Thread(target=self._organize_loop, name=f'watch-organize-{i}', daemon=True)
+                          for i in range(WATCH_WORKERS)]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Watching {len(self._watches)} folders under {DOWNLOADS_PATH}")
+        return True
+
+    def stop(self):
+        """
+        Stop the watcher threads and release the inotify descriptor.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self._watches.clear()
+
+    def _is_category_dir(self, path):
+        return os.path.dirname(os.path.normpath(path)) == os.path.normpath(DOWNLOADS_PATH) and \
+            os.path.basename(path) in category_rules.category_dirs
+
+    def _wants_file(self, name):
+        return name not in RESERVED_FILES and not name.lower().endswith(self.PARTIAL_SUFFIXES)
+
+    def _watch_tree(self, top, enqueue_existing=False):
+        """
+        Add watches for `top` and every non-category folder below it.
+        With enqueue_existing=True, files already present (e.g. in a folder moved in whole) are scheduled too.
+        """
+        for root, dirs, files in os.walk(top):
+            if os.path.normpath(root) == os.path.normpath(DOWNLOADS_PATH):
+                dirs[:] = [d for d in dirs if d not in category_rules.category_dirs]
+            try:
+                wd = self.inotify.add_watch(root, self.FILE_EVENTS | self.DIR_EVENTS | Inotify.IN_ONLYDIR)
+                self._watches[wd] = root
+            except OSError as e:
+                logger.warning(f"Could not watch {root}: {e}")
+                continue
+            if enqueue_existing:
+                for name in files:
+                    if self._wants_file(name):
+                        self._schedule(os.path.join(root, name))
+
+    def _schedule(self, path):
+        with self._lock:
+            self._due[path] = time.monotonic() + WATCH_DEBOUNCE_MS / 1000.0
+
+    def _handle_event(self, wd, mask, name):
+        if mask & Inotify.IN_Q_OVERFLOW:
+            # Events were dropped; fall back to a one-off incremental scan
+            self.overflows += 1
+            logger.warning("Inotify queue overflowed, rescanning downloads folder")
+            snapshot = self.organizer.snapshot
+            with snapshot.lock:
+                for path in snapshot.scan(DOWNLOADS_PATH, category_rules.category_dirs):
+                    self._schedule(path)
+                snapshot.save()
+            return
+        root = self._watches.get(wd)
+        if root is None:
+            return
+        if mask & (Inotify.IN_IGNORED | Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF):
+            if mask & Inotify.IN_IGNORED:
+                self._watches.pop(wd, None)
+            return
+        path = os.path.join(root, name)
+        if mask & Inotify.IN_ISDIR:
+            if mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO) and not self._is_category_dir(path):
+                self._watch_tree(path, enqueue_existing=True)
+        elif mask & self.FILE_EVENTS and self._wants_file(name):
+            self._schedule(path)
+
+    def _read_loop(self):
+        """
+        Read inotify events and release debounced files into the organize queue.
+        """
+        while not self._stop.is_set():
+            try:
+                for wd, mask, name in self.inotify.read_events(timeout=WATCH_DEBOUNCE_MS / 1000.0):
+                    self._handle_event(wd, mask, name)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                logger.error(f"Error reading watch events: {e}")
+                time.sleep(1)
+            now = time.monotonic()
+            with self._lock:
+                ready = [path for path, deadline in self._due.items() if deadline <= now]
+                for path in ready:
+                    del self._due[path]
+            for path in ready:
+                # Blocks when the workers fall behind, applying backpressure to the reader
+                self._queue.put(path)
+
+    def _organize_loop(self):
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if not os.path.isfile(path):
+                continue
+            if self.organizer.restored_by_undo(path):
+                logger.info(f"Watch mode leaving {path} alone: it was restored by an undo")
+                continue
+            success, result = self.organizer.organize_file(path)
+            if not success:
+                # It may have been recorded by an overflow rescan; let incremental runs retry it
+                snapshot = self.organizer.snapshot
+                with snapshot.lock:
+                    snapshot.forget(path)
+                    try:
+                        snapshot.save()
+                    except Exception as e:
+                        logger.error(f"Error saving directory snapshot: {e}")
+            with self._lock:
+                if success:
+                    self.organized += 1
+                else:
+                    self.errors += 1
+                    logger.warning(f"Watch mode could not organize {path}: {result}")
+
+    def status(self):
+        """
+        Snapshot of the watcher state and counters.
+        """
+        with self._lock:
+            return {
+                'running': self.running,
+                'watched_folders': len(self._watches),
+                'debouncing': len(self._due),
+                'queued': self._queue.qsize(),
+                'organized': self.organized,
+                'errors': self.errors,
+                'overflows': self.overflows
+            }
+
+
+class DestinationIndex:
+    """
+    In-memory index of the names taken in each category folder, used to hand out
+    collision-free destinations without probing the filesystem one suffix at a time.
+    Each folder is seeded with a single os.scandir and updated as names are handed out;
+    the next free counter for every base name is remembered, so repeated names such as
+    documents_invoice_N.pdf resolve in O(1). Names are claimed on disk atomically by FileMover,
+    so another process or a file created behind our back can never be clobbered.
+    Folders are re-seeded after DESTINATION_INDEX_TTL seconds to notice external deletions.
+    """
+    def __init__(self, sanitize):
+        self.sanitize = sanitize
+        self._lock = threading.Lock()
+        self._names = {}
+        self._seeded_at = {}
+        self._next_counter = {}
+
+    def _names_for(self, folder):
+        """
+        Return the set of names taken in `folder`, seeding it from disk if missing or stale.
+        Must be called with the lock held.
+        """
+        seeded_at = self._seeded_at.get(folder)
+        if seeded_at is None or time.monotonic() - seeded_at > DESTINATION_INDEX_TTL:
+            try:
+                with os.scandir(folder) as entries:
+                    self._names[folder] = {entry.name for entry in entries}
+            except FileNotFoundError:
+                self._names[folder] = set()
+            self._seeded_at[folder] = time.monotonic()
+            self._next_counter = {key: value for key, value in self._next_counter.items() if key[0] != folder}
+        return self._names[folder]
+
+    def _candidate(self, folder, category, clean_name, ext):
+        """
+        Pick the next name not known to be taken and mark it taken.
+        Must be called with the lock held.
+        """
+        names = self._names_for(folder)
+        key = (folder, category, clean_name, ext)
+        counter = self._next_counter.get(key, 0)
+        while True:
+            suffix = f"_{counter}" if counter else ""
+            name = self.sanitize(f"{category}_{clean_name}{suffix}{ext}")
+            if name not in names:
+                break
+            counter += 1
+        names.add(name)
+        self._next_counter[key] = counter + 1
+        return name
+
+    def next_path(self, folder, category, clean_name, ext):
+        """
+        Return the next candidate destination in `folder` without touching the disk.
+        The caller claims it atomically (see FileMover) and asks again on FileExistsError.
+        """
+        with self._lock:
+            return os.path.join(folder, self._candidate(folder, category, clean_name, ext))
+
+    def reserve(self, paths):
+        """
+        Mark `paths` as taken so they are not handed out, e.g. destinations a plan is about to use.
+        """
+        with self._lock:
+            for path in paths:
+                self._names_for(os.path.dirname(path)).add(os.path.basename(path))
+
+    def release(self, path):
+        """
+        Give back a name whose move failed so it can be handed out again.
+        """
+        with self._lock:
+            names = self._names.get(os.path.dirname(path))
+            if names is not None:
+                names.discard(os.path.basename(path))
+
+
+class FileMover:
+    """
+    Moves files without ever overwriting an existing destination.
+    Same-device moves use renameat2(RENAME_NOREPLACE), falling back to link+unlink and then to an
+    O_EXCL placeholder plus rename where the filesystem lacks support. Cross-device moves create the
+    destination with O_EXCL, stream the data in-kernel with copy_file_range (or sendfile), fsync it,
+    copy the metadata and only then remove the source. Latency is tracked per move kind.
+    """
+    AT_FDCWD = -100
+    RENAME_NOREPLACE = 1
+    COPY_CHUNK = 8 * 1024 * 1024
+
+    def __init__(self):
+        self._renameat2 = None
+        self._link_supported = True
+        try:
+            renameat2 = load_libc().renameat2
+            renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+            self._renameat2 = renameat2
+        except (OSError, AttributeError):
+            pass
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _record(self, kind, elapsed, size):
+        with self._lock:
+            stats = self._metrics.setdefault(kind, {'count': 0, 'bytes': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['bytes'] += size
+            stats['total_ms'] += elapsed * 1000
+            stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+
+    def metrics(self):
+        """
+        Per move kind: count, bytes moved, and total, average and maximum latency in milliseconds.
+        """
+        with self._lock:
+            return {kind: dict(stats, avg_ms=round(stats['total_ms'] / stats['count'], 3),
+                               total_ms=round(stats['total_ms'], 3), max_ms=round(stats['max_ms'], 3))
+                    for kind, stats in self._metrics.items()}
+
+    def move(self, src, dest, claimed=None):
+        """
+        Move `src` to `dest`, raising FileExistsError if `dest` already exists.
+        `claimed(dest)` is called as soon as a separate file has been created at `dest`
+        (a placeholder or the target of a copy) and before any data is moved into it.
+        Returns the kind of move performed.
+        """
+        started = time.perf_counter()
+        src_stat = os.stat(src)
+        if src_stat.st_dev == os.stat(os.path.dirname(dest)).st_dev:
+            try:
+                kind = self._rename_noreplace(src, dest, claimed)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                kind = self._copy_across(src, dest, claimed)
+        else:
+            kind = self._copy_across(src, dest, claimed)
+        self._record(kind, time.perf_counter() - started, src_stat.st_size)
+        return kind
+
+    def link_duplicate(self, existing, src, dest, claimed=None):
+        """
+        Replace `src` with a hard link to its identical copy `existing`, placed at `dest`.
+        Raises FileExistsError if `dest` exists; falls back to a plain move if linking is impossible.
+        `claimed` is called once the link exists, as for move().
+        """
+        started = time.perf_counter()
+        try:
+            os.link(existing, dest)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            logger.warning(f"Could not hard-link duplicate ({e}), moving it instead")
+            return self.move(src, dest, claimed)
+        if claimed is not None:
+            claimed(dest)
+        os.unlink(src)
+        self._record('dedup_link', time.perf_counter() - started, 0)
+        return 'dedup_link'
+
+    def _rename_noreplace(self, src, dest, claimed=None):
+        if self._renameat2 is not None:
+            if self._renameat2(self.AT_FDCWD, os.fsencode(src), self.AT_FDCWD, os.fsencode(dest),
+                               self.RENAME_NOREPLACE) == 0:
+                return 'rename'
+            err = ctypes.get_errno()
+            if err not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise OSError(err, os.strerror(err), dest)
+            # Filesystem or kernel without RENAME_NOREPLACE
+            self._renameat2 = None
+        if self._link_supported:
+            try:
+                os.link(src, dest)
+                os.unlink(src)
+                return 'link'
+            except OSError as e:
+                if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOSYS):
+                    raise
+                self._link_supported = False
+        fd = os.open(dest, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        os.close(fd)
+        try:
+            if claimed is not None:
+                claimed(dest)
+            os.replace(src, dest)
+        except OSError:
+            os.remove(dest)
+            raise
+        return 'rename_placeholder'
+
+    def _copy_across(self, src, dest, claimed=None):
+        with open(src, 'rb') as fsrc:
+            fd = os.open(dest, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            try:
+                if claimed is not None:
+                    claimed(dest)
+                copied = self._stream(fsrc.fileno(), fd, os.fstat(fsrc.fileno()).st_size)
+                # The source may have grown or shrunk while it was copied
+                size = os.fstat(fsrc.fileno()).st_size
+                if copied != size:
+                    raise OSError(errno.EIO, f"Copied {copied} of {size} bytes", src)
+                os.fsync(fd)
+            except BaseException:
+                os.close(fd)
+                os.remove(dest)
+                raise
+            os.close(fd)
+        shutil.copystat(src, dest)
+        os.unlink(src)
+        return 'copy'
+
+    def _stream(self, in_fd, out_fd, size):
+        """
+        Copy `size` bytes between descriptors in-kernel where possible, finishing with plain
+        reads and writes if the kernel copy stops short. Returns the number of bytes copied.
+        """
+        offset = 0
+        for copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+            if copy is None:
+                continue
+            try:
+                while offset < size:
+                    if copy is os.sendfile:
+                        sent = os.sendfile(out_fd, in_fd, offset, min(self.COPY_CHUNK, size - offset))
+                    else:
+                        sent = os.copy_file_range(in_fd, out_fd, min(self.COPY_CHUNK, size - offset), offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                continue
+            if offset >= size:
+                return offset
+            # Some filesystems report 0 from copy_file_range without being at EOF
+            break
+        os.lseek(in_fd, offset, os.SEEK_SET)
+        os.lseek(out_fd, offset, os.SEEK_SET)
+        while True:
+            chunk = os.read(in_fd, 1024 * 1024)
+            if not chunk:
+                return offset
+            view = memoryview(chunk)
+            while view:
+                written = os.write(out_fd, view)
+                view = view[written:]
+            offset += len(chunk)
+
+
+class FingerprintIndex:
+    """
+    Persistent SQLite index of file content hashes, keyed by (device, inode).
+    Each row remembers the size and mtime_ns the hashes were computed for; a lookup whose
+    stat metadata no longer matches is treated as a miss and overwritten, so edited files are
+    rehashed automatically. It also holds the size index of organized files that duplicate
+    detection draws candidates from, shared by every process. A background thread periodically
+    drops rows for files that are gone or changed and vacuums the database.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.RLock()
+        self._compactor = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                     timeout=SQLITE_BUSY_TIMEOUT)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                partial TEXT,
+                full TEXT,
+                PRIMARY KEY (dev, ino)
+            )
+        """)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS organized_sizes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_organized_sizes_size ON organized_sizes(size);
+        """)
+
+    def get(self, st, kind):
+        """
+        Return the cached 'partial' or 'full' hash for a stat result, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(f'SELECT size, mtime_ns, {kind} FROM fingerprints WHERE dev = ? AND ino = ?',
+                                     (st.st_dev, st.st_ino)).fetchone()
+            if row is None or row[2] is None:
+                self.misses += 1
+                return None
+            if (row[0], row[1]) != (st.st_size, st.st_mtime_ns):
+                self.stale += 1
+                return None
+            self.hits += 1
+            return row[2]
+
+    def put(self, path, st, kind, value):
+        """
+        Store a hash for the file described by `st`, discarding hashes of an older version.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime_ns FROM fingerprints WHERE dev = ? AND ino = ?',
+                                     (st.st_dev, st.st_ino)).fetchone()
+            if row is not None and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+                self._conn.execute(f'UPDATE fingerprints SET {kind} = ?, path = ? WHERE dev = ? AND ino = ?',
+                                   (value, path, st.st_dev, st.st_ino))
+            else:
+                self._conn.execute(f'INSERT OR REPLACE INTO fingerprints (dev, ino, size, mtime_ns, path, {kind}) '
+                                   'VALUES (?, ?, ?, ?, ?, ?)',
+                                   (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, path, value))
+        self._ensure_compactor()
+
+    def add_sizes(self, files):
+        """
+        Record organized files as (path, size) pairs for candidates_of_size.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO organized_sizes (path, size) VALUES (?, ?)', files)
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def candidates_of_size(self, size):
+        """
+        Paths of organized files recorded with this size, by any process.
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT path FROM organized_sizes WHERE size = ?', (size,))]
+
+    def relocate(self, st, new_path):
+        """
+        Follow a file that was moved. Renames keep the inode, so only the recorded path changes.
+        """
+        with self._lock:
+            self._conn.execute('UPDATE fingerprints SET path = ? WHERE dev = ? AND ino = ?',
+                               (new_path, st.st_dev, st.st_ino))
+
+    def compact(self):
+        """
+        Drop rows whose file is gone or no longer matches, then reclaim space.
+        Returns the number of rows removed.
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT dev, ino, size, mtime_ns, path FROM fingerprints').fetchall()
+        dead = []
+        for dev, ino, size, mtime_ns, path in rows:
+            try:
+                st = os.stat(path)
+                if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != (dev, ino, size, mtime_ns):
+                    dead.append((dev, ino))
+            except OSError:
+                dead.append((dev, ino))
+        with self._lock:
+            sizes = self._conn.execute('SELECT path, size FROM organized_sizes').fetchall()
+        gone = []
+        for path, size in sizes:
+            try:
+                if os.stat(path).st_size != size:
+                    gone.append((path,))
+            except OSError:
+                gone.append((path,))
+        if dead or gone:
+            with self._lock:
+                self._conn.executemany('DELETE FROM fingerprints WHERE dev = ? AND ino = ?', dead)
+                self._conn.executemany('DELETE FROM organized_sizes WHERE path = ?', gone)
+                self._conn.execute('VACUUM')
+            logger.info(f"Fingerprint index compacted, removed {len(dead) + len(gone)} stale entries")
+        return len(dead) + len(gone)
+
+    def _ensure_compactor(self):
+        if self._compactor is not None or FINGERPRINT_COMPACT_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._compact_loop, name='fingerprint-compactor', daemon=True)
+                self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(FINGERPRINT_COMPACT_INTERVAL)
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting fingerprint index: {e}")
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+            return {'entries': entries, 'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DuplicateDetector:
+    """
+    Finds exact content duplicates of incoming files among already-organized ones.
+    Candidates are narrowed by size, then by a BLAKE2 hash of the first and last 64 KiB,
+    and only then confirmed with a full streaming BLAKE2 hash read through mmap. Hashes are
+    kept in the persistent FingerprintIndex, so unchanged files are never hashed twice. The size
+    index lives there too, so files organized by other worker processes are candidates as well;
+    each process adds one scan of the category folders on first use, and every organized file
+    is added as it lands.
+    """
+    PARTIAL_BLOCK = 64 * 1024
+    FULL_CHUNK = 4 * 1024 * 1024
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._seeded = False
+        self.fingerprints = FingerprintIndex(FINGERPRINT_DB_FILE) if self.enabled else None
+
+    @property
+    def enabled(self):
+        return self.mode in ('link', 'skip', 'quarantine')
+
+    def _ensure_seeded(self):
+        """
+        Add the files already in the category folders to the size index, once per process.
+        """
+        with self._lock:
+            if self._seeded:
+                return
+            files = []
+            for category in category_rules.categories + ('others',):
+                folder = os.path.join(DOWNLOADS_PATH, category)
+                try:
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            if entry.is_file(follow_symlinks=False):
+                                size = entry.stat(follow_symlinks=False).st_size
+                                if size >= DEDUP_MIN_SIZE:
+                                    files.append((entry.path, size))
+                except FileNotFoundError:
+                    continue
+            self.fingerprints.add_sizes(files)
+            self._seeded = True
+        logger.info(f"Duplicate index seeded with {len(files)} files")
+
+    def add(self, path):
+        """
+        Register a newly organized file as a duplicate candidate.
+        Any fingerprint taken before the move is updated to the new path.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self.fingerprints.relocate(st, path)
+        if st.st_size < DEDUP_MIN_SIZE:
+            return
+        self._ensure_seeded()
+        self.fingerprints.add_sizes([(path, st.st_size)])
+
+    def _hash(self, path, st, kind):
+        """
+        Return the 'partial' or 'full' BLAKE2 digest of a file, using the fingerprint index.
+        """
+        cached = self.fingerprints.get(st, kind)
+        if cached is not None:
+            return cached
+        digest = hashlib.blake2b(digest_size=32)
+        with open(path, 'rb') as f:
+            if kind == 'partial':
+                digest.update(f.read(self.PARTIAL_BLOCK))
+                if st.st_size > 2 * self.PARTIAL_BLOCK:
+                    f.seek(-self.PARTIAL_BLOCK, os.SEEK_END)
+                    digest.update(f.read(self.PARTIAL_BLOCK))
+                elif st.st_size > self.PARTIAL_BLOCK:
+                    digest.update(f.read())
+            elif st.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        for offset in range(0, len(view), self.FULL_CHUNK):
+                            digest.update(view[offset:offset + self.FULL_CHUNK])
+                    finally:
+                        view.release()
+        value = digest.hexdigest()
+        self.fingerprints.put(path, st, kind, value)
+        return value
+
+    def find(self, path):
+        """
+        Return the path of an organized file with identical content, or None.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size < DEDUP_MIN_SIZE:
+            return None
+        self._ensure_seeded()
+        candidates = self.fingerprints.candidates_of_size(st.st_size)
+        if not candidates:
+            return None
+        partial = None
+        for candidate in candidates:
+            try:
+                cst = os.stat(candidate)
+                if cst.st_size != st.st_size:
+                    continue
+                if (cst.st_dev, cst.st_ino) == (st.st_dev, st.st_ino):
+                    return candidate
+                partial = partial or self._hash(path, st, 'partial')
+                if self._hash(candidate, cst, 'partial') != partial:
+                    continue
+                if self._hash(candidate, cst, 'full') == self._hash(path, st, 'full'):
+                    return candidate
+            except OSError:
+                # Candidate was removed or renamed since it was indexed
+                continue
+        return None
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least 1/rate seconds apart.
+    A rate of 0 or less disables limiting.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+
+    def wait(self):
+        """
+        Block until the caller may proceed.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DescriptionCache:
+    """
+    Persistent SQLite cache of AI descriptions with LRU and TTL eviction.
+    Keys combine the normalized cleaned file name, extension, a power-of-two size bucket
+    and the action type, so near-identical downloads (invoice_3.pdf, invoice_4.pdf) share an entry.
+    """
+    EVICT_EVERY = 100
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._lock = threading.RLock()
+        self._conn = None
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                         timeout=SQLITE_BUSY_TIMEOUT)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS descriptions (
+                    key TEXT PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_descriptions_last_used ON descriptions(last_used);
+                CREATE INDEX IF NOT EXISTS idx_descriptions_created ON descriptions(created);
+            """)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def key_for(new_name, size, action_type):
+        """
+        Build the cache key for an operation.
+        Collision counters are dropped and remaining digit runs collapsed, so numbered variants match.
+        """
+        stem, ext = os.path.splitext(new_name.lower())
+        stem = re.sub(r'_\d+$', '', stem)
+        stem = re.sub(r'\d+', '#', stem)
+        return f"{action_type}|{stem}|{ext}|{max(size, 0).bit_length()}"
+
+    def get(self, key):
+        """
+        Return the cached description for `key`, or None on a miss or expired entry.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT description, created FROM descriptions WHERE key = ?', (key,)).fetchone()
+            if row is None or (self.ttl and row[1] + self.ttl < now):
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE descriptions SET last_used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, description):
+        """
+        Store a description, evicting expired and least recently used entries periodically.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO descriptions (key, description, created, last_used) '
+                               'VALUES (?, ?, ?, ?)', (key, description, now, now))
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= self.EVICT_EVERY:
+                self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used ones beyond max_entries.
+        """
+        with self._lock:
+            if self.ttl:
+                self._conn.execute('DELETE FROM descriptions WHERE created < ?', (time.time() - self.ttl,))
+            self._conn.execute('DELETE FROM descriptions WHERE key IN ('
+                               'SELECT key FROM descriptions ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                               (self.max_entries,))
+            self._puts_since_evict = 0
+
+    def stats(self):
+        """
+        Hit/miss counters and current size.
+        """
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM descriptions').fetchone()[0] if self.enabled else 0
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': size,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class DescriptionEnricher:
+    """
+    Background workers that fill in AI descriptions for operations already recorded as 'pending'.
+    Each worker gathers up to AI_BATCH_SIZE entries (waiting at most AI_BATCH_WAIT_MS) and describes
+    them with a single model call, falling back to one call per entry if the batch can't be parsed.
+    Entries matching the description cache skip the model entirely.
+    Model calls are rate limited and retried with exponential backoff; entries that keep failing
+    get the plain fallback description and a 'failed' status.
+    """
+    def __init__(self, organizer):
+        self.organizer = organizer
+        self.rate_limiter = RateLimiter(AI_RATE_LIMIT)
+        self.cache = DescriptionCache(AI_CACHE_FILE, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._queued_ids = set()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.batch_fallbacks = 0
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(AI_CONCURRENCY):
+                worker = threading.Thread(target=self._run, name=f'enricher-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, entry):
+        """
+        Queue a recorded entry for description. Entries already queued are ignored.
+        """
+        with self._lock:
+            if entry['id'] in self._queued_ids:
+                return
+            self._queued_ids.add(entry['id'])
+        self._queue.put(entry)
+        self._ensure_workers()
+
+    def resume_pending(self):
+        """
+        Re-queue entries left pending by a previous run.
+        """
+        if not model:
+            return
+        try:
+            pending = self.organizer.history.pending()
+        except Exception as e:
+            logger.error(f"Error loading pending descriptions: {e}")
+            return
+        for entry in pending:
+            self.submit(entry)
+        if pending:
+            logger.info(f"Resumed {len(pending)} pending AI descriptions")
+
+    def _with_retries(self, call, label):
+        """
+        Run a rate-limited model call, retrying with jittered exponential backoff.
+        ValueError (an unusable response) is raised immediately; other errors are
+        re-raised once AI_MAX_RETRIES is exhausted.
+        """
+        for attempt in range(AI_MAX_RETRIES + 1):
+            self.rate_limiter.wait()
+            try:
+                return call()
+            except ValueError:
+                raise
+            except Exception as e:
+                if attempt == AI_MAX_RETRIES:
+                    raise
+                delay = AI_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"AI description failed for {label} ({e}), retrying in {delay:.1f}s")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def _describe(self, entry):
+        """
+        Generate a description for one entry.
+        Returns a tuple (description, status).
+        """
+        try:
+            description = self._with_retries(
+                lambda: self.organizer.request_ai_description(
+                    entry['new_path'], "organized and renamed", entry['original_name'], entry['new_name']
+                ),
+                entry['new_name']
+            )
+            return description, 'done'
+        except Exception as e:
+            logger.error(f"Giving up on AI description for {entry['new_name']}: {e}")
+            return f"File organized and renamed: {entry['new_name']}", 'failed'
+
+    def _describe_batch(self, entries):
+        """
+        Generate descriptions for several entries with one model call.
+        Falls back to per-entry calls if the batched response can't be used.
+        Returns a list of (description, status) tuples in the same order.
+        """
+        if len(entries) == 1:
+            return [self._describe(entries[0])]
+        operations = [{
+            'file_path': entry['new_path'],
+            'action_type': "organized and renamed",
+            'old_name': entry['original_name'],
+            'new_name': entry['new_name']
+        } for entry in entries]
+        try:
+            descriptions = self._with_retries(
+                lambda: self.organizer.request_ai_descriptions(operations),
+                f"batch of {len(entries)}"
+            )
+            with self._lock:
+                self.batches += 1
+            return [(description, 'done') for description in descriptions]
+        except Exception as e:
+            logger.warning(f"Batched AI description failed ({e}), falling back to per-file calls")
+            with self._lock:
+                self.batch_fallbacks += 1
+            return [self._describe(entry) for entry in entries]
+
+    def _describe_entries(self, entries):
+        """
+        Resolve descriptions from the cache where possible and send only distinct misses to the model.
+        Returns a list of (description, status) tuples in the same order as `entries`.
+        """
+        results = [None] * len(entries)
+        misses = {}
+        for index, entry in enumerate(entries):
+            size = os.path.getsize(entry['new_path']) if os.path.exists(entry['new_path']) else 0
+            key = self.cache.key_for(entry['new_name'], size, "organized and renamed")
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = (cached, 'done')
+            else:
+                misses.setdefault(key, []).append(index)
+        if misses:
+            keys = list(misses)
+            fresh = self._describe_batch([entries[misses[key][0]] for key in keys])
+            for key, (description, status) in zip(keys, fresh):
+                if status == 'done':
+                    self.cache.put(key, description)
+                for index in misses[key]:
+                    results[index] = (description, status)
+        return results
+
+    def _next_batch(self):
+        """
+        Block for the next entry, then gather more until the batch is full or the wait expires.
+        """
+        entries = [self._queue.get()]
+        deadline = time.monotonic() + AI_BATCH_WAIT_MS / 1000.0
+        while len(entries) < AI_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entries.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return entries
+
+    def _run(self):
+        while True:
+            entries = self._next_batch()
+            with self._lock:
+                self.in_flight += len(entries)
+            try:
+                results = self._describe_entries(entries)
+            except Exception as e:
+                logger.error(f"Error enriching {len(entries)} entries: {e}")
+                results = [(f"File organized and renamed: {entry['new_name']}", 'failed') for entry in entries]
+            for entry, (description, status) in zip(entries, results):
+                try:
+                    self.organizer.history.update(entry['id'], {'ai_description': description, 'ai_status': status})
+                    events.publish('description', {'id': entry['id'], 'ai_description': description,
+                                                   'ai_status': status})
+                except Exception as e:
+                    logger.error(f"Error enriching entry {entry.get('id')}: {e}")
+                    status = 'failed'
+                with self._lock:
+                    if status == 'done':
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self.in_flight -= 1
+                    self._queued_ids.discard(entry['id'])
+
+    def status(self):
+        """
+        Snapshot of the enrichment backlog and counters.
+        """
+        with self._lock:
+            return {
+                'enabled': model is not None,
+                'backlog': self._queue.qsize(),
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'failed': self.failed,
+                'retries': self.retries,
+                'batches': self.batches,
+                'batch_fallbacks': self.batch_fallbacks,
+                'batch_size': AI_BATCH_SIZE,
+                'workers': len(self._workers),
+                'rate_limit_per_second': AI_RATE_LIMIT,
+                'cache': self.cache.stats()
+            }
+
+class EventSubscription:
+    """
+    One live event stream. Events are buffered in a bounded queue; if the client falls behind
+    and the queue fills up, `lagged` is set so the stream can tell the client to resync.
+    """
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lagged = threading.Event()
+
+
+class EventBroadcaster:
+    """
+    Fan-out of organizer events to every connected /events stream. Publishing never blocks,
+    so a slow client cannot hold up the organize pipeline.
+    """
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self):
+        subscription = EventSubscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((event_type, data))
+            except queue.Full:
+                subscription.lagged.set()
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'published': self.published}
+
+events = EventBroadcaster(EVENTS_QUEUE_SIZE)
+
+
+def stats_delta(entry):
+    """
+    Change to the /stats counters caused by one recorded operation.
+    """
+    delta = {'total_operations': 1, 'total_organized': 0, 'unorganized': 0, 'category_counts': {}}
+    if entry['action'] == 'duplicate_skipped':
+        return delta
+    if os.path.dirname(entry['original_path']) == os.path.abspath(DOWNLOADS_PATH):
+        delta['unorganized'] = -1
+    # Like CategoryCounters.recount, files filed under 'others' are not counted as organized
+    if entry['category'] not in category_rules.categories:
+        return delta
+    if os.path.dirname(entry['new_path']) == os.path.join(os.path.abspath(DOWNLOADS_PATH), entry['category']):
+        delta['total_organized'] = 1
+        delta['category_counts'][entry['category']] = 1
+    return delta
+
+
+class CategoryCounters:
+    """
+    In-memory file counts behind /stats: files per category folder, unorganized files in the
+    downloads root and the number of recorded operations. Counts are updated from each recorded
+    operation and reconciled with a full recount every STATS_RECONCILE_INTERVAL seconds, which
+    also corrects for files added or removed outside the organizer. Operations recorded by other
+    worker processes sharing the history trigger a recount on the next snapshot.
+    """
+    def __init__(self, history):
+        self.history = history
+        self._lock = threading.Lock()
+        self._counts = None
+        self._version = None
+        self._reconciler = None
+        self.recounts = 0
+        self.last_recount = None
+
+    def recount(self):
+        """
+        Count everything from disk and replace the cached counts. Returns the new counts.
+        """
+        # Read first, so another process writing during the count triggers one more recount
+        version = self.history.external_version()
+        category_counts = {}
+        for category in category_rules.categories:
+            try:
+                with os.scandir(os.path.join(DOWNLOADS_PATH, category)) as entries:
+                    category_counts[category] = sum(1 for entry in entries if entry.is_file())
+            except FileNotFoundError:
+                continue
+        unorganized = 0
+        if os.path.exists(DOWNLOADS_PATH):
+            with os.scandir(DOWNLOADS_PATH) as entries:
+                unorganized = sum(1 for entry in entries if entry.is_file() and entry.name not in RESERVED_FILES)
+        counts = {
+            'total_organized': sum(category_counts.values()),
+            'unorganized': unorganized,
+            'category_counts': category_counts,
+            'total_operations': self.history.count()
+        }
+        with self._lock:
+            self._counts = counts
+            self._version = version
+            self.recounts += 1
+            self.last_recount = time.time()
+        return self.snapshot()
+
+    def apply(self, delta):
+        """
+        Apply the change from one recorded operation (see stats_delta).
+        """
+        with self._lock:
+            if self._counts is None:
+                return
+            for key in ('total_organized', 'unorganized', 'total_operations'):
+                self._counts[key] += delta[key]
+            for category, change in delta['category_counts'].items():
+                category_counts = self._counts['category_counts']
+                category_counts[category] = category_counts.get(category, 0) + change
+
+    def snapshot(self):
+        """
+        Current counts, counting from disk first if nothing has been counted yet.
+        """
+        self._ensure_reconciler()
+        version = self.history.external_version()
+        with self._lock:
+            counts = self._counts
+            if (counts is not None and version == self._version
+                    and set(counts['category_counts']) <= set(category_rules.categories)):
+                return dict(counts, category_counts=dict(counts['category_counts']))
+        # First call, another process recorded operations, or the category rules changed since the last count
+        return self.recount()
+
+    def _ensure_reconciler(self):
+        with self._lock:
+            if self._reconciler is not None or STATS_RECONCILE_INTERVAL <= 0:
+                return
+            self._reconciler = threading.Thread(target=self._reconcile_loop, name='stats-reconcile', daemon=True)
+            self._reconciler.start()
+
+    def _reconcile_loop(self):
+        while True:
+            time.sleep(STATS_RECONCILE_INTERVAL)
+            try:
+                self.recount()
+            except Exception as e:
+                logger.error(f"Error reconciling stats: {e}")
+
+
+class FileListing:
+    """
+    Cached listing of the unorganized files in the downloads root behind /files.
+    One scandir pass fills the cache (a single stat per file via DirEntry.stat()); it expires
+    after FILES_CACHE_TTL seconds or as soon as an organize operation invalidates it.
+    Sorted views are built once per cache fill and paged through with keyset cursors.
+    """
+    SORT_KEYS = {
+        'name': lambda f: f['name'],
+        'size': lambda f: f['size'],
+        'mtime': lambda f: f['modified']
+    }
+
+    def __init__(self, organizer):
+        self.organizer = organizer
+        self._lock = threading.Lock()
+        self._files = None
+        self._loaded_at = 0.0
+        self._views = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._files = None
+            self._views = {}
+
+    def _scan(self):
+        files = []
+        with os.scandir(DOWNLOADS_PATH) as entries:
+            for entry in entries:
+                if entry.name in RESERVED_FILES or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append({
+                    'name': entry.name,
+                    'size': st.st_size,
+                    'category': self.organizer.get_file_category(entry.path),
+                    'modified': st.st_mtime
+                })
+        return files
+
+    def _view(self, sort, category):
+        """
+        Files matching `category`, sorted ascending by (sort key, name), plus the matching key list.
+        """
+        with self._lock:
+            if self._files is None or time.monotonic() - self._loaded_at > FILES_CACHE_TTL:
+                self._files = self._scan()
+                self._loaded_at = time.monotonic()
+                self._views = {}
+            view = self._views.get((sort, category))
+            if view is None:
+                sort_key = self.SORT_KEYS[sort]
+                files = [f for f in self._files if category is None or f['category'] == category]
+                files.sort(key=lambda f: (sort_key(f), f['name']))
+                view = (files, [(sort_key(f), f['name']) for f in files])
+                self._views[(sort, category)] = view
+            return view
+
+    @staticmethod
+    def encode_cursor(key):
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            value, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return value, name
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def page(self, sort='name', order='asc', category=None, limit=None, cursor=None):
+        """
+        Return (files, next_cursor, total) for one page. Without a limit every file is returned.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unknown sort order: {order}")
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        files, keys = self._view(sort, category)
+        after = tuple(self.decode_cursor(cursor)) if cursor else None
+        if after and keys and type(after[0]) is not type(keys[0][0]) and not (
+                isinstance(after[0], (int, float)) and isinstance(keys[0][0], (int, float))):
+            raise ValueError(f"Cursor does not match sort key: {sort}")
+        if order == 'asc':
+            start = bisect.bisect_right(keys, after) if after else 0
+            end = len(files) if limit is None else min(len(files), start + limit)
+            page = files[start:end]
+            more = end < len(files)
+        else:
+            end = bisect.bisect_left(keys, after) if after else len(files)
+            start = 0 if limit is None else max(0, end - limit)
+            page = files[start:end][::-1]
+            more = start > 0
+        next_cursor = None
+        if page and more:
+            last = page[-1]
+            next_cursor = self.encode_cursor([self.SORT_KEYS[sort](last), last['name']])
+        return page, next_cursor, len(files)
+
+
+class OrganizePlan:
+    """
+    The moves an organize run would make, computed without touching the disk: one
+    {'source', 'destination', 'category'} mapping per file, with name collisions already
+    resolved against the category folders' current contents and the plan itself.
+    """
+    def __init__(self, moves, plan_id=None, created_at=None, batch_id=None):
+        self.id = plan_id or uuid.uuid4().hex
+        self.created_at = created_at or time.time()
+        self.moves = moves
+        # Set once the plan has been applied (see FileOrganizer.apply_plan)
+        self.batch_id = batch_id
+
+    def to_dict(self, limit=None):
+        return {
+            'plan_id': self.id,
+            'created_at': self.created_at,
+            'batch_id': self.batch_id,
+            'count': len(self.moves),
+            'moves': self.moves[:limit] if limit else self.moves
+        }
+
+
+class UndoJournal:
+    """
+    Compact on-disk record of one applied organize plan, kept in the batches folder.
+    The first line describes the batch and each following line is a planned [source, destination]
+    pair; it is fsynced before any file is moved. Every move then appends, again fsynced before
+    it happens, the destination actually tried and the inode the file will have there, so undo
+    only moves back files that are provably the batch's own. Once the moves are done a line
+    records which ones failed, and undoing the batch appends a final line so it is never
+    reversed twice.
+    """
+    def __init__(self, batch_id):
+        self.batch_id = batch_id
+        self.path = os.path.join(DOWNLOADS_PATH, BATCHES_FOLDER, f"{batch_id}.jsonl")
+
+    def _append(self, lines):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, plan_id, moves):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._append([{'batch_id': self.batch_id, 'plan_id': plan_id, 'created_at': time.time(), 'count': len(moves)},
+                      *([move['source'], move['destination']] for move in moves)])
+        # Make sure the journal itself survives a crash before any file moves
+        dir_fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def placing(self, position, destination, inode):
+        """
+        Record that move `position` is about to land at `destination` as `inode`.
+        """
+        self._append([{'move': position, 'destination': destination, 'inode': inode}])
+
+    def commit(self, failed):
+        self._append([{'done': time.time(), 'failed': failed}])
+
+    def restoring(self, files):
+        """
+        Record the moves an undo is about to reverse, as [position, size, mtime_ns, inode]
+        of each file; renaming it back keeps all three.
+        """
+        self._append([{'restoring': files}])
+
+    def mark_undone(self, restored, errors):
+        self._append([{'undone': time.time(), 'restored': restored, 'errors': errors}])
+
+    def load(self):
+        """
+        Return (header, moves, placed, state): the planned moves, the last recorded
+        (destination, inode) per move position, and the 'done', 'restoring' and 'undone'
+        lines merged.
+        Raises FileNotFoundError for an unknown batch.
+        """
+        header, moves, placed, state = None, [], {}, {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash; everything before it is intact
+                    continue
+                if isinstance(record, list):
+                    moves.append(record)
+                elif header is None:
+                    header = record
+                elif 'move' in record:
+                    placed[record['move']] = (record['destination'], record['inode'])
+                elif 'restoring' in record:
+                    state.setdefault('restoring', {}).update(
+                        (position, file_state) for position, *file_state in record['restoring'])
+                else:
+                    state.update(record)
+        return header, moves, placed, state
+
+
+class IntentLog:
+    """
+    Write-ahead log of file moves. An intent (source and destination) is written before a file
+    is moved and a commit once the move is in the history, so a crash in between can be
+    reconciled on the next start. Organize runs log their start and end, so runs that never
+    ended can be resumed. Lines are flushed immediately, which survives the process dying, and
+    fsynced in batches like the summary journal. The log is emptied whenever nothing is in flight.
+    Every process writes its own file in `directory` and holds a flock() on it while alive,
+    so recovery only ever picks up the logs of processes that are gone.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._lock = threading.Lock()
+        self._handle = None
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self._in_flight = 0
+        self._active_runs = 0
+
+    def _write(self, record):
+        """
+        Must be called with the lock held.
+        """
+        if self._handle is None:
+            self._open()
+        self._handle.write(json.dumps(record) + '\n')
+        self._handle.flush()
+        self._pending_sync += 1
+        if (self._pending_sync >= JOURNAL_FSYNC_EVERY or
+                time.monotonic() - self._last_sync >= JOURNAL_FSYNC_INTERVAL):
+            os.fsync(self._handle.fileno())
+            self._pending_sync = 0
+            self._last_sync = time.monotonic()
+
+    def _open(self):
+        """
+        Create this process's log, locked before it becomes visible to recovery under its final name.
+        Must be called with the lock held.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        self._handle = open(tmp_path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        self.path = os.path.join(self.directory, f"{name}.jsonl")
+        os.rename(tmp_path, self.path)
+
+    def _truncate_if_idle(self):
+        """
+        Must be called with the lock held.
+        """
+        if self._in_flight <= 0 and self._active_runs <= 0 and self._handle is not None:
+            self._handle.truncate(0)
+            self._handle.seek(0)
+            self._in_flight = 0
+
+    def begin_run(self, incremental):
+        run_id = uuid.uuid4().hex
+        with self._lock:
+            self._active_runs += 1
+            self._write({'run': run_id, 'incremental': incremental})
+        return run_id
+
+    def end_run(self, run_id):
+        with self._lock:
+            self._active_runs -= 1
+            self._write({'end': run_id})
+            self._truncate_if_idle()
+
+    def intend(self, source, destination):
+        with self._lock:
+            self._in_flight += 1
+            self._write({'intent': source, 'dest': destination})
+
+    def claim(self, source):
+        """
+        The move of `source` created its destination file, so rolling it back may remove it.
+        """
+        with self._lock:
+            self._write({'claimed': source})
+
+    def abandon(self, source):
+        """
+        The move was not made (it failed or the destination was taken); nothing to recover.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._write({'abandon': source})
 
-# --- Gemini AI Initialization ---
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    logger.info("Gemini AI initialized successfully")
-else:
-    logger.warning("Gemini API key not found. AI features will be disabled.")
-    model = None
+    def commit(self, source, intended=True):
+        """
+        The file is handled and in the history. `intended` is False when it was recorded
+        without being moved (a skipped duplicate), so no intent was written for it.
+        """
+        with self._lock:
+            if intended:
+                self._in_flight -= 1
+            self._write({'commit': source})
+            self._truncate_if_idle()
+
+    def recover(self):
+        """
+        Read and remove the logs left behind by processes that died.
+        Returns (intents, runs): {source: (destination, claimed)} for moves that were started but
+        never committed, where `claimed` means the move itself created the destination file,
+        and for each run that never ended its 'incremental' flag and the sources it committed.
+        """
+        intents, runs = {}, {}
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path == self.path:
+                continue
+            try:
+                f = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                # Recovered by another process in the meantime
+                continue
+            with f:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # Its process is still running, or another process is recovering it
+                        continue
+                    if os.fstat(f.fileno()).st_nlink == 0:
+                        # Recovered and removed by another process before we got the lock
+                        continue
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from the crash
+                        continue
+                    if 'intent' in record:
+                        intents[record['intent']] = (record['dest'], False)
+                    elif 'claimed' in record:
+                        if record['claimed'] in intents:
+                            intents[record['claimed']] = (intents[record['claimed']][0], True)
+                    elif 'abandon' in record:
+                        intents.pop(record['abandon'], None)
+                    elif 'commit' in record:
+                        intents.pop(record['commit'], None)
+                        for run in runs.values():
+                            run['committed'].add(record['commit'])
+                    elif 'run' in record:
+                        runs[record['run']] = {'incremental': record['incremental'], 'committed': set()}
+                    elif 'end' in record:
+                        runs.pop(record['end'], None)
+                os.remove(path)
+        return intents, list(runs.values())
+
+    def close(self):
+        """
+        Close the log, removing it if nothing is left to recover.
+        """
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+                if self._in_flight <= 0 and self._active_runs <= 0:
+                    os.remove(self.path)
+
+
+class SharedState:
+    """
+    Organize job progress and dry-run plans kept in SQLite, so that with several worker
+    processes any of them can report on a job, cancel it, or apply a plan another one created.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                     timeout=SQLITE_BUSY_TIMEOUT)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+            CREATE TABLE IF NOT EXISTS plans (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                moves TEXT NOT NULL,
+                batch_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_plans_created_at ON plans(created_at);
+        """)
+
+    def save_job(self, status):
+        """
+        Store the latest status snapshot of a job, keeping the newest ORGANIZE_JOBS_KEEP finished jobs.
+        """
+        finished = status['finished_at'] is not None
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO jobs (id, created_at, finished, status) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET finished = excluded.finished, status = excluded.status""",
+                (status['id'], status['created_at'], int(finished), json.dumps(status)))
+            if finished:
+                self._conn.execute(
+                    """DELETE FROM jobs WHERE finished = 1 AND id NOT IN
+                       (SELECT id FROM jobs WHERE finished = 1 ORDER BY created_at DESC LIMIT ?)""",
+                    (ORGANIZE_JOBS_KEEP,))
+
+    def job(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def jobs(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status FROM jobs ORDER BY created_at DESC').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def request_cancel(self, job_id):
+        """
+        Flag a job for cancellation; the process running it notices within a moment.
+        Returns False if the job is unknown.
+        """
+        with self._lock:
+            return self._conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?',
+                                      (job_id,)).rowcount > 0
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def save_plan(self, plan):
+        """
+        Store a plan, keeping only the newest ORGANIZE_PLANS_KEEP.
+        """
+        with self._lock:
+            self._conn.execute('INSERT INTO plans (id, created_at, moves) VALUES (?, ?, ?)',
+                               (plan.id, plan.created_at, json.dumps(plan.moves)))
+            self._conn.execute('DELETE FROM plans WHERE id NOT IN (SELECT id FROM plans ORDER BY created_at DESC LIMIT ?)',
+                               (ORGANIZE_PLANS_KEEP,))
+
+    def plan(self, plan_id):
+        with self._lock:
+            row = self._conn.execute('SELECT id, created_at, moves, batch_id FROM plans WHERE id = ?',
+                                     (plan_id,)).fetchone()
+        if row is None:
+            return None
+        return OrganizePlan(json.loads(row[2]), plan_id=row[0], created_at=row[1], batch_id=row[3])
+
+    def claim_plan(self, plan_id, batch_id):
+        """
+        Atomically mark a plan as applied by `batch_id`. Returns False if it was applied already.
+        """
+        with self._lock:
+            return self._conn.execute('UPDATE plans SET batch_id = ? WHERE id = ? AND batch_id IS NULL',
+                                      (batch_id, plan_id)).rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
 
-# File type mappings
-FILE_CATEGORIES = {
-    'images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.tiff'],
-    'documents': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'],
-    'spreadsheets': ['.xls', '.xlsx', '.csv', '.ods', '.numbers'],
-    'presentations': ['.ppt', '.pptx', '.odp', '.key'],
-    'videos': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'],
-    'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'],
-    'archives': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz'],
-    'executables': ['.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm', '.appimage'],
-    'code': ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.php', '.rb', '.go'],
-    'fonts': ['.ttf', '.otf', '.woff', '.woff2', '.eot']
-}
 
 class FileOrganizer:
     """
@@ -50,48 +2840,58 @@ class FileOrganizer:
     It moves files into category folders, generates AI-powered descriptions, and maintains an operation log.
     """
     def __init__(self):
-        self.summary = []
+        self.history = create_history_store()
+        self.destinations = DestinationIndex(self.sanitize_filename)
+        self.mover = FileMover()
+        self.duplicates = DuplicateDetector(DEDUP_MODE)
+        self.snapshot = DirectorySnapshot(SNAPSHOT_FILE)
         self.load_existing_summary()
+        category_rules.remember(self.history.categories())
+        self.counters = CategoryCounters(self.history)
+        self.listing = FileListing(self)
+        self.state = SharedState(STATE_DB_FILE)
+        self.run_lock = ProcessLock(ORGANIZE_LOCK_FILE)
+        self.intents = IntentLog(os.path.join(DOWNLOADS_PATH, INTENTS_FOLDER))
+        atexit.register(self.intents.close)
+        atexit.register(self.state.close)
+        self.enricher = DescriptionEnricher(self)
+        atexit.register(self.history.close)
+        atexit.register(self.enricher.cache.close)
+        if self.duplicates.fingerprints:
+            atexit.register(self.duplicates.fingerprints.close)
 
     def load_existing_summary(self):
         """
-        Load the organization summary from disk if it exists.
-        Initializes an empty summary if not found or on error.
+        Prepare the operation history, migrating legacy JSON summaries into SQLite once.
+        Entries themselves are not loaded into memory here.
         """
-        if os.path.exists(SUMMARY_FILE):
-            try:
-                with open(SUMMARY_FILE, 'r') as f:
-                    self.summary = json.load(f)
-                logger.info(f"Loaded {len(self.summary)} entries from summary file")
-            except Exception as e:
-                logger.error(f"Error loading summary: {e}")
-                self.summary = []
+        try:
+            if isinstance(self.history, SqliteHistoryStore):
+                migrate_legacy_history(self.history)
+        except Exception as e:
+            logger.error(f"Error migrating summary: {e}")
+        if self.history.exists():
+            logger.info(f"Using existing operation history ({HISTORY_BACKEND})")
         else:
             logger.info("No existing summary file found, starting fresh")
 
-    def save_summary(self):
+    def save_summary(self, action_summary):
         """
-        Save the current organization summary to disk.
-        Ensures the summary directory exists before writing.
+        Record a single action in the operation history.
+        Returns the id of the new entry, or None on error.
         """
         try:
-            os.makedirs(os.path.dirname(SUMMARY_FILE), exist_ok=True)
-            with open(SUMMARY_FILE, 'w') as f:
-                json.dump(self.summary, f, indent=2, default=str)
-            logger.info(f"Summary saved with {len(self.summary)} entries")
+            return self.history.append(action_summary)
         except Exception as e:
             logger.error(f"Error saving summary: {e}")
+            return None
 
     def get_file_category(self, file_path):
         """
         Determine the file category based on its extension.
         Returns the category name or 'others' if not matched.
         """
-        extension = Path(file_path).suffix.lower()
-        for category, extensions in FILE_CATEGORIES.items():
-            if extension in extensions:
-                return category
-        return 'others'
+        return category_rules.classify(os.path.basename(file_path))
 
     def sanitize_filename(self, filename):
         """
@@ -101,6 +2901,68 @@ class FileOrganizer:
         sanitized = secure_filename(sanitized)
         return sanitized
 
+    def request_ai_description(self, file_path, action_type, old_name=None, new_name=None):
+        """
+        Ask Gemini for a brief description of a file operation.
+        Raises on any model error so callers can decide whether to retry.
+        """
+        file_info = {
+            'filename': new_name or old_name,
+            'size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
+            'extension': Path(file_path).suffix,
+            'action': action_type
+        }
+        prompt = f"""
+        Analyze this file operation and provide a brief, informative description:
+        Action: {action_type}
+        Filename: {file_info['filename']}
+        File extension: {file_info['extension']}
+        File size: {file_info['size']} bytes
+        Old name: {old_name if old_name else 'N/A'}
+        New name: {new_name if new_name else 'N/A'}
+        Provide a concise description (max 100 words) of what this file likely contains and the action performed.
+        """
+        response = model.generate_content(prompt)
+        return response.text.strip()
+
+    def request_ai_descriptions(self, operations):
+        """
+        Ask Gemini to describe several file operations with a single prompt.
+        `operations` is a list of dicts with 'file_path', 'action_type', 'old_name' and 'new_name'.
+        Returns one description per operation, in order. Raises ValueError if the
+        response is not a JSON array of matching length.
+        """
+        items = []
+        for index, op in enumerate(operations):
+            file_path = op['file_path']
+            items.append({
+                'index': index,
+                'action': op['action_type'],
+                'filename': op.get('new_name') or op.get('old_name'),
+                'extension': Path(file_path).suffix,
+                'size_bytes': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
+                'old_name': op.get('old_name') or 'N/A',
+                'new_name': op.get('new_name') or 'N/A'
+            })
+        prompt = f"""
+        Analyze each of these file operations and provide a brief, informative description for each:
+        {json.dumps(items, indent=2)}
+        For every operation, write a concise description (max 100 words) of what the file likely contains and the action performed.
+        Respond with only a JSON array of {len(items)} strings, where element i describes the operation with index i.
+        """
+        response = model.generate_content(prompt)
+        text = response.text.strip()
+        # Models often wrap JSON in a markdown code fence
+        if text.startswith('```'):
+            text = text.strip('`')
+            if text.lower().startswith('json'):
+                text = text[4:]
+        descriptions = json.loads(text)
+        if (not isinstance(descriptions, list) or len(descriptions) != len(operations)
+                or not all(isinstance(d, str) for d in descriptions)):
+            raise ValueError(f"Expected a JSON array of {len(operations)} strings")
+        return [d.strip() for d in descriptions]
+
     def generate_ai_description(self, file_path, action_type, old_name=None, new_name=None):
         """
         Generate a brief, AI-powered description of a file operation.
@@ -109,145 +2971,763 @@ class FileOrganizer:
         if not model:
             return f"File {action_type}: {new_name or old_name}"
         try:
-            file_info = {
-                'filename': new_name or old_name,
-                'size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                'extension': Path(file_path).suffix,
-                'action': action_type
-            }
-            prompt = f"""
-            Analyze this file operation and provide a brief, informative description:
-            Action: {action_type}
-            Filename: {file_info['filename']}
-            File extension: {file_info['extension']}
-            File size: {file_info['size']} bytes
-            Old name: {old_name if old_name else 'N/A'}
-            New name: {new_name if new_name else 'N/A'}
-            Provide a concise description (max 100 words) of what this file likely contains and the action performed.
-            """
-            response = model.generate_content(prompt)
-            return response.text.strip()
+            return self.request_ai_description(file_path, action_type, old_name, new_name)
         except Exception as e:
             logger.error(f"Error generating AI description: {e}")
             return f"File {action_type}: {new_name or old_name}"
 
-    def organize_file(self, file_path):
+    def _place_unique(self, folder, category, clean_name, ext, place):
         """
-        Organize a single file by moving it to its category folder and logging the operation.
-        The new filename will include the category and a timestamp for uniqueness and clarity.
-        Returns a tuple (success, result) where result is the summary or error message.
+        Hand the next free name in `folder` to `place(dest)`, which must refuse to overwrite.
+        Names found taken on disk are skipped; returns the destination that was used.
+        """
+        while True:
+            new_file_path = self.destinations.next_path(folder, category, clean_name, ext)
+            try:
+                place(new_file_path)
+                return new_file_path
+            except FileExistsError:
+                # Created outside the index; it stays marked as taken and the next name is tried
+                continue
+            except Exception:
+                self.destinations.release(new_file_path)
+                raise
+
+    def _logged(self, source, place):
+        """
+        Wrap `place(dest, claimed)` so every attempt is written to the intent log first, and
+        a file the move creates at `dest` is logged as claimed (see FileMover.move).
+        The intent stays open on success until organize_file commits it.
+        """
+        def logged_place(dest):
+            self.intents.intend(source, dest)
+            try:
+                place(dest, lambda claimed_dest: self.intents.claim(source))
+            except BaseException:
+                self.intents.abandon(source)
+                raise
+        return logged_place
+
+    def move_to_category(self, file_path):
+        """
+        Move a single file into its category folder under a cleaned, unique name.
+        Returns a tuple (success, result) where result describes the move or is an error message.
         """
         try:
             if not os.path.exists(file_path):
                 logger.warning(f"File not found: {file_path}")
                 return False, "File not found"
             filename = os.path.basename(file_path)
-            category = self.get_file_category(file_path)
-            name, ext = os.path.splitext(filename)
-            # Clean the original name - keep only meaningful parts
-            # Split by common separators
-            name_parts = name.replace('_', ' ').replace('-', ' ').split()
-            cleaned_parts = []
-            for part in name_parts:
-                # Skip parts that look like UUIDs, hashes, or random strings
-                if (
-                    # Skip long hexadecimal-like strings and UUIDs
-                    not (len(part) >= 8 and all(c.isalnum() for c in part)) and
-                    # Skip date-like numbers
-                    not part.replace('_','').isdigit() and
-                    # Skip random short hex strings
-                    not (len(part) >= 4 and all(c in '0123456789abcdefABCDEF' for c in part))
-                ):
-                    cleaned_parts.append(part.lower())
-            
-            # If we removed all parts, keep just the first part of original name
-            if not cleaned_parts:
-                cleaned_parts = [name.split('_')[0]]
-                
-            # Join the cleaned parts
-            clean_name = '_'.join(cleaned_parts)
-            # Smart rename: just category + cleaned name
-            smart_name = f"{category}_{clean_name}{ext}"
-            sanitized_name = self.sanitize_filename(smart_name)
+            name, ext, category = category_rules.split(filename)
+            # Keep only the meaningful parts of the original name
+            clean_name = name_cleaner.clean(name)
             logger.info(f"Organizing file: {filename} -> Category: {category}")
-            category_path = os.path.join(DOWNLOADS_PATH, category)
-            os.makedirs(category_path, exist_ok=True)
-            new_file_path = os.path.join(category_path, sanitized_name)
-            counter = 1
-            # If file exists, add a counter
-            while os.path.exists(new_file_path):
-                smart_name = f"{category}_{clean_name}_{counter}{ext}"
-                sanitized_name = self.sanitize_filename(smart_name)
-                new_file_path = os.path.join(category_path, sanitized_name)
-                counter += 1
-            try:
-                shutil.move(file_path, new_file_path)
-                if not os.path.exists(new_file_path):
-                    logger.error("File move failed - destination file not found")
-                    return False, "File move failed"
+            moved = {
+                'original_name': filename,
+                'original_path': file_path,
+                'category': category
+            }
+            if self.duplicates.enabled and DEDUP_MODE == 'skip':
+                previous = self.skipped_before(file_path)
+                if previous:
+                    # Left in place by an earlier run, which already recorded it
+                    return True, dict(moved, recorded=previous)
+            duplicate_of = self.duplicates.find(file_path) if self.duplicates.enabled else None
+            if duplicate_of:
+                logger.info(f"{filename} is a duplicate of {duplicate_of} ({DEDUP_MODE})")
+                moved['duplicate_of'] = duplicate_of
+            if duplicate_of and DEDUP_MODE == 'skip':
+                st = os.stat(file_path)
+                moved.update(action='duplicate_skipped', new_path=file_path,
+                             file_state=[st.st_size, st.st_mtime_ns, st.st_ino])
+                return True, moved
+            folder = os.path.join(DOWNLOADS_PATH, DUPLICATES_FOLDER if duplicate_of and DEDUP_MODE == 'quarantine' else category)
+            os.makedirs(folder, exist_ok=True)
+            if duplicate_of and DEDUP_MODE == 'link':
+                place = self._logged(file_path, lambda dest, claimed: self.mover.link_duplicate(
+                    duplicate_of, file_path, dest, claimed))
+                moved['action'] = 'duplicate_linked'
+            else:
+                place = self._logged(file_path, lambda dest, claimed: self.mover.move(file_path, dest, claimed))
+                if duplicate_of:
+                    moved['action'] = 'duplicate_quarantined'
+            try:
+                # Smart rename: just category + cleaned name, with a counter if taken
+                moved['new_path'] = self._place_unique(folder, category, clean_name, ext, place)
             except Exception as move_err:
                 logger.error(f"Error moving file: {move_err}")
                 return False, f"Error moving file: {move_err}"
-            ai_description = self.generate_ai_description(
-                new_file_path, "organized and renamed", filename, os.path.basename(new_file_path)
-            )
+            if self.duplicates.enabled and not duplicate_of:
+                self.duplicates.add(moved['new_path'])
+            return True, moved
+        except Exception as e:
+            logger.error(f"Error organizing file {file_path}: {e}")
+            return False, str(e)
+
+    def restored_by_undo(self, file_path):
+        """
+        Return True if `file_path` was put back by undoing a batch and not organized since,
+        so automatic organizing (watch mode) should leave it alone.
+        """
+        previous = self.history.latest(file_path, 'organize')
+        if not previous or not previous.get('batch_id'):
+            return False
+        try:
+            _, moves, _, state = UndoJournal(previous['batch_id']).load()
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        file_state = [st.st_size, st.st_mtime_ns, st.st_ino]
+        return any(position < len(moves) and moves[position][0] == file_path and restored == file_state
+                   for position, restored in state.get('restoring', {}).items())
+
+    def skipped_before(self, file_path):
+        """
+        Return the history entry of an earlier run that left `file_path` in place as a skipped
+        duplicate, or None if there is none or the file changed since.
+        """
+        previous = self.history.latest(file_path, 'duplicate_skipped')
+        if previous is None:
+            return None
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return previous if previous.get('file_state') == [st.st_size, st.st_mtime_ns, st.st_ino] else None
+
+    def record_organized(self, moved):
+        """
+        Log a completed move to the operation history right away.
+        The AI description is left 'pending' and filled in later by the enricher.
+        Returns a tuple (success, result) where result is the summary or error message.
+        """
+        try:
+            new_name = os.path.basename(moved['new_path'])
+            if moved.get('duplicate_of'):
+                # Exact copies need no description of their own
+                ai_description = f"Exact duplicate of {os.path.basename(moved['duplicate_of'])}"
+                ai_status = 'skipped'
+            elif model:
+                ai_description, ai_status = 'pending', 'pending'
+            else:
+                ai_description, ai_status = f"File organized and renamed: {new_name}", 'disabled'
             action_summary = {
                 'timestamp': datetime.now().isoformat(),
-                'action': 'organize',
-                'original_name': filename,
-                'new_name': os.path.basename(new_file_path),
-                'original_path': file_path,
-                'new_path': new_file_path,
-                'category': category,
-                'ai_description': ai_description
+                'action': moved.get('action', 'organize'),
+                'original_name': moved['original_name'],
+                'new_name': new_name,
+                'original_path': moved['original_path'],
+                'new_path': moved['new_path'],
+                'category': moved['category'],
+                'ai_description': ai_description,
+                'ai_status': ai_status
             }
-            self.summary.append(action_summary)
-            self.save_summary()
+            if moved.get('duplicate_of'):
+                action_summary['duplicate_of'] = moved['duplicate_of']
+            if moved.get('file_state'):
+                action_summary['file_state'] = moved['file_state']
+            if moved.get('batch_id'):
+                action_summary['batch_id'] = moved['batch_id']
+            entry_id = self.save_summary(action_summary)
+            if entry_id is not None:
+                action_summary['id'] = entry_id
+                if ai_status == 'pending':
+                    self.enricher.submit(action_summary)
+            delta = stats_delta(action_summary)
+            self.counters.apply(delta)
+            self.listing.invalidate()
+            events.publish('organized', {'entry': action_summary, 'stats': delta})
             return True, action_summary
         except Exception as e:
-            logger.error(f"Error organizing file {file_path}: {e}")
+            logger.error(f"Error recording file {moved['original_path']}: {e}")
             return False, str(e)
 
-    def organize_all_files(self):
+    def recover_interrupted(self):
         """
-        Recursively organize all files in the downloads folder and its subfolders.
-        Returns lists of organized files and errors.
+        Reconcile moves a previous process started but never recorded, then return the organize
+        runs it never finished (see IntentLog.recover) so they can be resumed.
+        A move that completed is recorded in the history now; a half-done one is rolled back.
+        """
+        intents, runs = self.intents.recover()
+        for source, (destination, claimed) in intents.items():
+            try:
+                source_exists, destination_exists = os.path.exists(source), os.path.exists(destination)
+                if source_exists and destination_exists:
+                    if os.path.samefile(source, destination):
+                        # Linked into place but the source was not unlinked yet
+                        os.unlink(source)
+                        source_exists = False
+                    elif claimed:
+                        # A placeholder, link or partial cross-device copy the move created; the source is intact
+                        os.unlink(destination)
+                        logger.info(f"Rolled back unfinished move of {source}")
+                        continue
+                    else:
+                        # The move never got to create the destination, so the file there is someone else's
+                        logger.warning(f"Interrupted move of {source} found {destination} already taken; "
+                                       f"leaving both files")
+                        continue
+                if source_exists or not destination_exists:
+                    if not source_exists:
+                        logger.warning(f"Interrupted move of {source} left no file behind")
+                    continue
+                if self.history.has_move(source, destination):
+                    # Recorded, only the commit was lost
+                    continue
+                name, ext, category = category_rules.split(os.path.basename(source))
+                moved = {
+                    'original_name': os.path.basename(source),
+                    'original_path': source,
+                    'category': category,
+                    'new_path': destination
+                }
+                if os.path.basename(os.path.dirname(destination)) == DUPLICATES_FOLDER:
+                    moved['action'] = 'duplicate_quarantined'
+                self.record_organized(moved)
+                logger.info(f"Recovered unrecorded move {source} -> {destination}")
+            except Exception as e:
+                logger.error(f"Error recovering move of {source}: {e}")
+        if intents or runs:
+            logger.info(f"Recovery: {len(intents)} unfinished moves, {len(runs)} interrupted runs")
+        return runs
+
+    def organize_file(self, file_path):
+        """
+        Organize a single file by moving it to its category folder and logging the operation.
+        The new filename will include the category and a cleaned version of the original name.
+        Returns a tuple (success, result) where result is the summary or error message.
+        """
+        success, result = self.move_to_category(file_path)
+        if not success:
+            return False, result
+        if result.get('recorded'):
+            self.intents.commit(file_path, intended=False)
+            return True, result['recorded']
+        success, summary = self.record_organized(result)
+        if success:
+            self.intents.commit(file_path, intended=result.get('action') != 'duplicate_skipped')
+        return success, summary
+
+    def _walk_downloads(self, paths, emit, workers, incremental, completed, cancel, discovered, skip):
+        """
+        Walker stage: feed every file that still needs organizing into the bounded queue,
+        followed by one stop marker per move worker. In incremental mode only files that are
+        new or changed since the last snapshot are fed. Sets `completed` if the walk finished,
+        stops early once `cancel` is set and calls `discovered` for every file fed.
+        Paths in `skip` are left out, and so are duplicates an earlier run already skipped.
+        """
+        skip_known = self.duplicates.enabled and DEDUP_MODE == 'skip'
+        try:
+            if incremental:
+                item_paths = self.snapshot.scan(DOWNLOADS_PATH, category_rules.category_dirs)
+            else:
+                item_paths = iter_unorganized_files(DOWNLOADS_PATH)
+            for item_path in item_paths:
+                if cancel is not None and cancel.is_set():
+                    return
+                if skip and item_path in skip:
+                    continue
+                if skip_known and self.skipped_before(item_path):
+                    continue
+                paths.put(item_path)
+                if discovered is not None:
+                    discovered()
+            completed.set()
+        except Exception as e:
+            emit((False, f"Error listing directory contents: {e}"))
+        finally:
+            for _ in range(workers):
+                paths.put(None)
+
+    def _move_worker(self, paths, emit, cancel, unhandled):
+        """
+        Move stage: take paths off the queue, move them and record each operation.
+        Once `cancel` is set the remaining queued paths are drained without being moved.
+        Paths that failed or were drained are added to `unhandled`.
+        """
+        while True:
+            item_path = paths.get()
+            if item_path is None:
+                return
+            if cancel is not None and cancel.is_set():
+                unhandled.append(item_path)
+                continue
+            success, result = self.organize_file(item_path)
+            if success:
+                emit((True, result))
+            else:
+                unhandled.append(item_path)
+                emit((False, f"Error with {os.path.basename(item_path)}: {result}"))
+
+    def iter_organize(self, incremental=False, cancel=None, discovered=None, skip=None):
+        """
+        Recursively organize all files in the downloads folder and its subfolders, yielding
+        a (success, result) tuple as each file completes: the action summary on success,
+        an error message otherwise. The pipeline runs in the background and is throttled by
+        a bounded result queue, so memory stays constant however many files are processed.
+        If the consumer stops early, the run still completes and its results are discarded;
+        setting the optional `cancel` event stops it after the moves already in progress.
+        `discovered` is called once for every file the walker queues, and paths in `skip`
+        (files an interrupted run already handled) are not queued at all.
         """
-        organized_files = []
-        errors = []
         logger.info(f"Starting organization of files in: {DOWNLOADS_PATH}")
         if not os.path.exists(DOWNLOADS_PATH):
             logger.error(f"Downloads path does not exist: {DOWNLOADS_PATH}")
-            return organized_files, [f"Downloads path does not exist: {DOWNLOADS_PATH}"]
+            yield False, f"Downloads path does not exist: {DOWNLOADS_PATH}"
+            return
+        results = queue.Queue(maxsize=ORGANIZE_QUEUE_SIZE)
+        detached = threading.Event()
+        finished = object()
+
+        def emit(item):
+            while not detached.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def run():
+            try:
+                # One run at a time across all processes: concurrent walks would race for the
+                # same files, and incremental runs share one snapshot
+                with self.run_lock:
+                    run_id = self.intents.begin_run(incremental)
+                    try:
+                        if incremental:
+                            with self.snapshot.lock:
+                                self._run_pipeline(emit, True, cancel, discovered, skip)
+                        else:
+                            self._run_pipeline(emit, False, cancel, discovered, skip)
+                    finally:
+                        self.intents.end_run(run_id)
+            except Exception as e:
+                emit((False, f"Error organizing files: {e}"))
+            finally:
+                emit(finished)
+
+        threading.Thread(target=run, name='organize-run', daemon=True).start()
+        organized_count = error_count = 0
         try:
-            for root, dirs, files in os.walk(DOWNLOADS_PATH):
-                # Skip the category folders we created
-                if root == DOWNLOADS_PATH or not any(root.startswith(os.path.join(DOWNLOADS_PATH, category)) for category in FILE_CATEGORIES.keys()):
-                    for file in files:
-                        if file != 'organization_summary.json':
-                            item_path = os.path.join(root, file)
-                            success, result = self.organize_file(item_path)
-                            if success:
-                                organized_files.append(result)
-                            else:
-                                errors.append(f"Error with {file}: {result}")
-        except Exception as e:
-            errors.append(f"Error listing directory contents: {e}")
-        logger.info(f"Organization complete. Organized: {len(organized_files)}, Errors: {len(errors)}")
+            while True:
+                item = results.get()
+                if item is finished:
+                    break
+                if item[0]:
+                    organized_count += 1
+                else:
+                    error_count += 1
+                yield item
+        finally:
+            detached.set()
+        logger.info(f"Organization complete. Organized: {organized_count}, Errors: {error_count}")
+
+    def plan_organize(self):
+        """
+        Dry run of organize_all_files: scan the downloads folder once and work out every file's
+        category and destination, resolving collision suffixes in memory. Nothing is moved;
+        the plan is stored (the newest ORGANIZE_PLANS_KEEP) so it can be reviewed and applied later.
+        Duplicate detection is not part of planning.
+        """
+        sources = list(iter_unorganized_files(DOWNLOADS_PATH))
+        splits = [category_rules.split(os.path.basename(source)) for source in sources]
+        clean_names = name_cleaner.clean_many([stem for stem, _, _ in splits])
+        # A private index: planned names must not be handed out to live organize runs
+        destinations = DestinationIndex(self.sanitize_filename)
+        moves = []
+        for source, (_, ext, category), clean_name in zip(sources, splits, clean_names):
+            folder = os.path.join(DOWNLOADS_PATH, category)
+            moves.append({
+                'source': source,
+                'destination': destinations.next_path(folder, category, clean_name, ext),
+                'category': category
+            })
+        plan = OrganizePlan(moves)
+        self.state.save_plan(plan)
+        logger.info(f"Planned {len(moves)} moves (plan {plan.id})")
+        return plan
+
+    def get_plan(self, plan_id):
+        return self.state.plan(plan_id)
+
+    def apply_plan(self, plan):
+        """
+        Apply a dry-run plan as one batch: write its undo journal, then perform every move.
+        A destination taken since planning gets the next free name instead, never one a later
+        move of the plan is due to use. Each move is recorded in the history with the batch id.
+        Runs under the organize lock, so it never overlaps an organize run or an undo.
+        Raises ValueError if the plan was applied already.
+        """
+        with self.run_lock:
+            batch_id = uuid.uuid4().hex
+            if not self.state.claim_plan(plan.id, batch_id):
+                raise ValueError(f"Plan {plan.id} was already applied")
+            plan.batch_id = batch_id
+            journal = UndoJournal(plan.batch_id)
+            journal.begin(plan.id, plan.moves)
+            self.destinations.reserve(move['destination'] for move in plan.moves)
+            failed, errors = [], []
+            for position, move in enumerate(plan.moves):
+                source = move['source']
+                try:
+                    os.makedirs(os.path.dirname(move['destination']), exist_ok=True)
+                    inode = os.stat(source).st_ino
+
+                    def journaled_move(dest, claimed, position=position, source=source, inode=inode):
+                        journal.placing(position, dest, inode)
+                        if self.mover.move(source, dest, claimed) == 'copy':
+                            # A cross-device copy is a new file
+                            journal.placing(position, dest, os.stat(dest).st_ino)
+
+                    place = self._logged(source, journaled_move)
+                    try:
+                        place(move['destination'])
+                        destination = move['destination']
+                    except FileExistsError:
+                        name, ext, category = category_rules.split(os.path.basename(source))
+                        destination = self._place_unique(os.path.dirname(move['destination']), move['category'],
+                                                         name_cleaner.clean(name), ext, place)
+                except Exception as e:
+                    failed.append(position)
+                    errors.append(f"Error with {os.path.basename(source)}: {e}")
+                    continue
+                if self.duplicates.enabled:
+                    self.duplicates.add(destination)
+                recorded, _ = self.record_organized({
+                    'original_name': os.path.basename(source),
+                    'original_path': source,
+                    'category': move['category'],
+                    'new_path': destination,
+                    'batch_id': plan.batch_id
+                })
+                if recorded:
+                    self.intents.commit(source)
+            journal.commit(failed)
+        applied = len(plan.moves) - len(failed)
+        logger.info(f"Applied plan {plan.id} as batch {plan.batch_id}: {applied} moved, {len(failed)} failed")
+        return {'batch_id': plan.batch_id, 'applied': applied, 'failed': len(failed), 'errors': errors}
+
+    def undo_batch(self, batch_id):
+        """
+        Move every file of an applied batch back where it came from, using the same
+        no-clobber renames. Only a file still at the destination its move was journaled with,
+        and with the inode recorded there, is moved, so batches interrupted mid-apply can be
+        undone too and files that replaced the batch's own are left alone. Runs under the
+        organize lock. Raises FileNotFoundError for an unknown batch and ValueError if it
+        was undone already.
+        """
+        with self.run_lock:
+            journal = UndoJournal(batch_id)
+            header, moves, placed, state = journal.load()
+            if 'undone' in state:
+                raise ValueError(f"Batch {batch_id} was already undone")
+            restorable, errors = [], []
+            for position, (source, _) in enumerate(moves):
+                if position not in placed:
+                    # Never attempted
+                    continue
+                destination, inode = placed[position]
+                try:
+                    st = os.stat(destination)
+                except FileNotFoundError:
+                    st = None
+                if st is None or st.st_ino != inode:
+                    # The move failed, or the file was moved, deleted or replaced since
+                    if 'done' in state and position not in state.get('failed', ()):
+                        errors.append(f"Missing {os.path.basename(destination)}")
+                    continue
+                restorable.append([position, st.st_size, st.st_mtime_ns, st.st_ino])
+            # Written first, so the watcher never re-organizes a file as it lands back in place
+            journal.restoring(restorable)
+            restored = 0
+            for position, *_ in restorable:
+                source, (destination, _) = moves[position][0], placed[position]
+                try:
+                    os.makedirs(os.path.dirname(source), exist_ok=True)
+                    self.mover.move(destination, source)
+                except Exception as e:
+                    errors.append(f"Error restoring {os.path.basename(source)}: {e}")
+                    continue
+                self.destinations.release(destination)
+                if self.duplicates.fingerprints:
+                    self.duplicates.fingerprints.relocate(os.stat(source), source)
+                restored += 1
+            journal.mark_undone(restored, len(errors))
+        self.save_summary({
+            'timestamp': datetime.now().isoformat(),
+            'action': 'undo',
+            'original_name': f"batch {batch_id}",
+            'new_name': f"{restored} files restored",
+            'category': None,
+            'ai_description': f"Undid organize batch {batch_id}: {restored} of {len(moves)} files moved back",
+            'ai_status': 'skipped',
+            'batch_id': batch_id
+        })
+        self.counters.recount()
+        self.listing.invalidate()
+        events.publish('undo', {'batch_id': batch_id, 'restored': restored, 'errors': len(errors)})
+        logger.info(f"Undid batch {batch_id}: {restored} restored, {len(errors)} errors")
+        return {'batch_id': batch_id, 'restored': restored, 'errors': errors}
+
+    def organize_all_files(self, incremental=False):
+        """
+        Recursively organize all files in the downloads folder and its subfolders.
+        A walker thread feeds a bounded queue and a pool of workers performs the moves;
+        AI descriptions are generated afterwards by the background enricher.
+        With incremental=True only entries that are new or changed since the previous
+        incremental run are considered (see DirectorySnapshot).
+        Returns lists of organized files and errors.
+        """
+        organized_files = []
+        errors = []
+        for success, result in self.iter_organize(incremental=incremental):
+            if success:
+                organized_files.append(result)
+            else:
+                errors.append(result)
         return organized_files, errors
 
-    def get_summary(self, limit=None):
+    def _run_pipeline(self, emit, incremental, cancel=None, discovered=None, skip=None):
         """
-        Get the organization summary, most recent first. Optionally limit the number of entries.
+        Run the walker and move workers to completion, persisting the snapshot after a complete incremental walk.
         """
-        summary_data = self.summary.copy()
-        summary_data.reverse()
-        if limit:
-            summary_data = summary_data[:limit]
-        return summary_data
+        paths = queue.Queue(maxsize=ORGANIZE_QUEUE_SIZE)
+        completed = threading.Event()
+        unhandled = []
+        with ThreadPoolExecutor(max_workers=ORGANIZE_WORKERS, thread_name_prefix='organize') as move_pool:
+            walker = threading.Thread(target=self._walk_downloads,
+                                      args=(paths, emit, ORGANIZE_WORKERS, incremental, completed,
+                                            cancel, discovered, skip), daemon=True)
+            walker.start()
+            movers = [move_pool.submit(self._move_worker, paths, emit, cancel, unhandled)
+                      for _ in range(ORGANIZE_WORKERS)]
+            for mover in movers:
+                mover.result()
+            walker.join()
+        if incremental and completed.is_set():
+            # Files that were not moved must be picked up again by the next incremental run
+            for path in unhandled:
+                self.snapshot.forget(path)
+            try:
+                self.snapshot.save()
+            except Exception as e:
+                emit((False, f"Error saving directory snapshot: {e}"))
+
+    def get_summary(self, limit=None, **filters):
+        """
+        Get the organization summary, most recent first. Optionally limit the number of entries
+        and page or filter them (see HistoryStore.query).
+        """
+        if not any(value is not None for value in filters.values()):
+            return self.history.recent(limit)
+        return self.history.query(limit=limit, **filters)
+
+class OrganizeJob:
+    """
+    Progress of one background organize run. `total` counts the files discovered so far and only
+    becomes final once the job ends, so until then the ETA covers the files already discovered.
+    """
+    def __init__(self, incremental, skip=None):
+        self.id = uuid.uuid4().hex
+        self.incremental = incremental
+        self.skip = skip
+        self.state = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.total = 0
+        self.organized = 0
+        self.error_count = 0
+        self.errors = []
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def discovered(self):
+        with self._lock:
+            self.total += 1
+
+    def record(self, success, result):
+        with self._lock:
+            if success:
+                self.organized += 1
+            else:
+                self.error_count += 1
+                if len(self.errors) < ORGANIZE_JOB_MAX_ERRORS:
+                    self.errors.append(result)
+
+    def status(self):
+        """
+        Snapshot of the job's progress, throughput (files per second) and ETA in seconds.
+        """
+        with self._lock:
+            processed = self.organized + self.error_count
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            throughput = processed / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self.state == 'running' and throughput > 0:
+                eta = round(max(0, self.total - processed) / throughput, 1)
+            return {
+                'id': self.id,
+                'state': self.state,
+                'incremental': self.incremental,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'processed': processed,
+                'total': self.total,
+                'total_final': self.finished_at is not None,
+                'organized_count': self.organized,
+                'error_count': self.error_count,
+                'errors': list(self.errors),
+                'elapsed_seconds': round(elapsed, 3),
+                'throughput_per_second': round(throughput, 2),
+                'eta_seconds': eta
+            }
+
+
+class OrganizeJobs:
+    """
+    Runs organize jobs one at a time on a background executor so requests return immediately.
+    Job status is mirrored to the shared state every JOB_STATUS_INTERVAL seconds, so any worker
+    process can report on or cancel any job; the most recent ORGANIZE_JOBS_KEEP are kept.
+    """
+    def __init__(self, organizer):
+        self.organizer = organizer
+        self.state = organizer.state
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='organize-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, incremental=False, skip=None):
+        job = OrganizeJob(incremental, skip)
+        with self._lock:
+            self._jobs[job.id] = job
+        self.state.save_job(job.status())
+        self._executor.submit(self._run, job)
+        logger.info(f"Queued organize job {job.id} (incremental={incremental})")
+        return job
+
+    def status(self, job_id):
+        """
+        Current status of a job run by any process, or None if it is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.status() if job is not None else self.state.job(job_id)
+
+    def resume_interrupted(self):
+        """
+        Recover after a crash and queue a job for every organize run that was cut short.
+        Files those runs already handled are skipped rather than walked and recorded again.
+        """
+        for run in self.organizer.recover_interrupted():
+            if RESUME_INTERRUPTED_RUNS:
+                job = self.submit(incremental=run['incremental'], skip=run['committed'])
+                logger.info(f"Resuming interrupted organize run as job {job.id}")
+
+    def list(self):
+        return self.state.jobs()
+
+    def cancel(self, job_id):
+        """
+        Ask a queued or running job to stop. Returns its status, or None if it is unknown.
+        """
+        if not self.state.request_cancel(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+        logger.info(f"Cancellation requested for organize job {job_id}")
+        return self.status(job_id)
+
+    def _publish(self, job):
+        status = job.status()
+        self.state.save_job(status)
+        events.publish('job', status)
+
+    def _run(self, job):
+        try:
+            self._execute(job)
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+
+    def _execute(self, job):
+        if job.cancel_event.is_set() or self.state.cancel_requested(job.id):
+            job.state = 'cancelled'
+            job.finished_at = time.time()
+            self._publish(job)
+            return
+        job.state = 'running'
+        job.started_at = time.time()
+        self._publish(job)
+        next_save = time.monotonic() + JOB_STATUS_INTERVAL
+        try:
+            for success, result in self.organizer.iter_organize(incremental=job.incremental,
+                                                                cancel=job.cancel_event,
+                                                                discovered=job.discovered,
+                                                                skip=job.skip):
+                job.record(success, result)
+                if time.monotonic() >= next_save:
+                    # Progress for other processes, and cancellations requested through them
+                    self.state.save_job(job.status())
+                    if self.state.cancel_requested(job.id):
+                        job.cancel_event.set()
+                    next_save = time.monotonic() + JOB_STATUS_INTERVAL
+            job.state = 'cancelled' if job.cancel_event.is_set() else 'completed'
+        except Exception as e:
+            logger.error(f"Organize job {job.id} failed: {e}")
+            job.record(False, str(e))
+            job.state = 'failed'
+        finally:
+            job.finished_at = time.time()
+        logger.info(f"Organize job {job.id} {job.state}: {job.organized} organized, {job.error_count} errors")
+        self._publish(job)
+
+
+def parse_bool(value):
+    """
+    Parse a query-string flag such as ?incremental=1 or ?incremental=true.
+    """
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def parse_timestamp(value):
+    """
+    Parse a query-string time given as an ISO 8601 string or Unix seconds into the ISO form stored in the history.
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).isoformat()
+    try:
+        return datetime.fromtimestamp(seconds).isoformat()
+    except (ValueError, OverflowError, OSError) as e:
+        raise ValueError(f"Timestamp out of range: {value}") from e
 
 # Initialize organizer
 organizer = FileOrganizer()
+watcher = DownloadsWatcher(organizer)
+jobs = OrganizeJobs(organizer)
+leader_lock = ProcessLock(LEADER_LOCK_FILE)
+
+def start_background_services():
+    """
+    Recover from a crash, resume the AI description backlog and start the watcher.
+    Every process recovers the logs of processes that died (a replacement worker picks up
+    after the one it replaces). The other services run in one process only: the first to take
+    the leader lock holds it for life, and a replacement process takes over if the leader dies.
+    Returns True if this process runs the services.
+    """
+    jobs.resume_interrupted()
+    if not leader_lock.acquire(blocking=False):
+        logger.info("Background services are running in another process")
+        return False
+    organizer.enricher.resume_pending()
+    if WATCH_MODE:
+        watcher.start()
+    return True
 
 @app.route('/')
 def index():
@@ -258,8 +3738,21 @@ def index():
 def organize_files():
     """Organize all files in downloads folder"""
     try:
-        logger.info("Organization request received")
-        organized, errors = organizer.organize_all_files()
+        incremental = request.args.get('incremental', default=ORGANIZE_INCREMENTAL, type=parse_bool)
+        stream = request.args.get('stream', default=False, type=parse_bool) or \
+            request.accept_mimetypes.best == 'application/x-ndjson'
+        logger.info(f"Organization request received (incremental={incremental}, stream={stream})")
+        if request.args.get('dry_run', default=False, type=parse_bool):
+            plan = organizer.plan_organize()
+            return jsonify(dict(plan.to_dict(limit=request.args.get('limit', type=int)), success=True))
+        if stream:
+            return Response(stream_organize(incremental), mimetype='application/x-ndjson')
+        if request.args.get('background', default=False, type=parse_bool):
+            job = jobs.submit(incremental=incremental)
+            response = jsonify({'success': True, 'job_id': job.id, 'status_url': f'/jobs/{job.id}'})
+            response.headers['Location'] = f'/jobs/{job.id}'
+            return response, 202
+        organized, errors = organizer.organize_all_files(incremental=incremental)
         
         response_data = {
             'success': True,
@@ -275,6 +3768,127 @@ def organize_files():
         logger.error(f"Error in organize_files endpoint: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def stream_organize(incremental):
+    """
+    Yield one NDJSON line per organized file or error as it completes, then a final summary line.
+    """
+    organized_count = error_count = 0
+    try:
+        for success, result in organizer.iter_organize(incremental=incremental):
+            if success:
+                organized_count += 1
+                line = {'type': 'organized', 'result': result}
+            else:
+                error_count += 1
+                line = {'type': 'error', 'error': result}
+            yield json.dumps(line, default=str) + '\n'
+        yield json.dumps({'type': 'done', 'success': True, 'organized_count': organized_count,
+                          'error_count': error_count}) + '\n'
+    except Exception as e:
+        logger.error(f"Error streaming organization results: {e}")
+        yield json.dumps({'type': 'done', 'success': False, 'error': str(e)}) + '\n'
+
+@app.route('/plans/<plan_id>')
+def get_plan(plan_id):
+    """A stored dry-run organize plan"""
+    plan = organizer.get_plan(plan_id)
+    if plan is None:
+        return jsonify({'success': False, 'error': 'Plan not found'}), 404
+    return jsonify(dict(plan.to_dict(limit=request.args.get('limit', type=int)), success=True))
+
+@app.route('/plans/<plan_id>/apply', methods=['POST'])
+def apply_plan(plan_id):
+    """Apply a stored dry-run plan as one undoable batch"""
+    plan = organizer.get_plan(plan_id)
+    if plan is None:
+        return jsonify({'success': False, 'error': 'Plan not found'}), 404
+    try:
+        return jsonify(dict(organizer.apply_plan(plan), success=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error applying plan {plan_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/undo/<batch_id>', methods=['POST'])
+def undo_batch(batch_id):
+    """Move every file of an applied batch back to where it was"""
+    if not re.fullmatch(r'[0-9a-f]{32}', batch_id):
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    try:
+        return jsonify(dict(organizer.undo_batch(batch_id), success=True))
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error undoing batch {batch_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/jobs')
+def list_jobs():
+    """Recent background organize jobs, newest first"""
+    return jsonify(jobs.list())
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Progress of a background organize job; DELETE cancels it"""
+    if request.method == 'DELETE':
+        status = jobs.cancel(job_id)
+    else:
+        status = jobs.status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@app.route('/events')
+def event_stream():
+    """Server-Sent Events feed of organize results, stat deltas, descriptions and job updates"""
+    subscription = events.subscribe()
+
+    def generate():
+        try:
+            # Sent first so the client knows the feed is live and can load the current state
+            yield 'event: ready\ndata: {}\n\n'
+            version = organizer.history.external_version()
+            checked = last_sent = time.monotonic()
+            while True:
+                try:
+                    item = subscription.queue.get(timeout=EVENTS_KEEPALIVE if version is None else EVENTS_SHARED_POLL)
+                except queue.Empty:
+                    item = None
+                now = time.monotonic()
+                if version is not None and now - checked >= EVENTS_SHARED_POLL:
+                    # Other worker processes publish their events to their own clients only
+                    checked = now
+                    current = organizer.history.external_version()
+                    if current != version:
+                        version = current
+                        last_sent = now
+                        yield 'event: resync\ndata: {}\n\n'
+                if item is None:
+                    if now - last_sent >= EVENTS_KEEPALIVE:
+                        last_sent = now
+                        yield ': keep-alive\n\n'
+                    continue
+                last_sent = now
+                event_type, data = item
+                if subscription.lagged.is_set():
+                    # Events were dropped: discard the backlog and have the client reload once
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.lagged.clear()
+                    yield 'event: resync\ndata: {}\n\n'
+                    continue
+                yield f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            events.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/organize/<filename>', methods=['POST'])
 def organize_single_file(filename):
     """Organize a specific file"""
@@ -293,26 +3907,23 @@ def organize_single_file(filename):
 
 @app.route('/files')
 def list_files():
-    """List all files in downloads folder"""
+    """List files in downloads folder, optionally filtered, sorted and paginated"""
     try:
-        files = []
-        
         if not os.path.exists(DOWNLOADS_PATH):
             return jsonify({'files': [], 'error': f'Downloads folder not found: {DOWNLOADS_PATH}'})
-            
-        for item in os.listdir(DOWNLOADS_PATH):
-            item_path = os.path.join(DOWNLOADS_PATH, item)
-            if os.path.isfile(item_path) and item != 'organization_summary.json':
-                file_info = {
-                    'name': item,
-                    'size': os.path.getsize(item_path),
-                    'category': organizer.get_file_category(item_path),
-                    'modified': os.path.getmtime(item_path)
-                }
-                files.append(file_info)
+        try:
+            files, next_cursor, total = organizer.listing.page(
+                sort=request.args.get('sort', 'name'),
+                order=request.args.get('order', 'asc'),
+                category=request.args.get('category'),
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        logger.info(f"Listed {len(files)} files from downloads folder")
-        return jsonify({'files': files})
+        logger.info(f"Listed {len(files)} of {total} files from downloads folder")
+        return jsonify({'files': files, 'next_cursor': next_cursor, 'total': total})
         
     except Exception as e:
         logger.error(f"Error listing files: {e}")
@@ -323,41 +3934,70 @@ def get_summary():
     """Get organization summary"""
     try:
         limit = request.args.get('limit', type=int)
-        summary = organizer.get_summary(limit)
-        return jsonify({'summary': summary})
+        if limit is not None and limit < 1:
+            return jsonify({'error': 'limit must be at least 1'}), 400
+        try:
+            filters = {
+                'before': request.args.get('before', type=int),
+                'after': request.args.get('after', type=int),
+                'category': request.args.get('category') or None,
+                'action': request.args.get('action') or None,
+                'since': parse_timestamp(request.args['since']) if request.args.get('since') else None,
+                'until': parse_timestamp(request.args['until']) if request.args.get('until') else None,
+                'search': request.args.get('q') or None
+            }
+        except ValueError as e:
+            return jsonify({'error': f"Invalid time filter: {e}"}), 400
+        summary = organizer.get_summary(limit, **filters)
+        return jsonify({
+            'summary': summary,
+            # Pass back as ?before= for the next (older) page or ?after= for newer entries
+            'before_cursor': summary[-1]['id'] if summary and limit and len(summary) == limit else None,
+            'after_cursor': summary[0]['id'] if summary else filters['after']
+        })
     except Exception as e:
         logger.error(f"Error getting summary: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/stats')
-def get_stats():
-    """Get organization statistics"""
+@app.route('/enrichment')
+def enrichment_status():
+    """Get the AI description backlog"""
     try:
-        # Count files by category
-        category_counts = {}
-        total_files = 0
-        
-        for category in FILE_CATEGORIES.keys():
-            category_path = os.path.join(DOWNLOADS_PATH, category)
-            if os.path.exists(category_path):
-                count = len([f for f in os.listdir(category_path) if os.path.isfile(os.path.join(category_path, f))])
-                category_counts[category] = count
-                total_files += count
-        
-        # Count unorganized files
-        unorganized = 0
-        if os.path.exists(DOWNLOADS_PATH):
-            for item in os.listdir(DOWNLOADS_PATH):
-                item_path = os.path.join(DOWNLOADS_PATH, item)
-                if os.path.isfile(item_path) and item != 'organization_summary.json':
-                    unorganized += 1
-        
+        return jsonify(organizer.enricher.status())
+    except Exception as e:
+        logger.error(f"Error getting enrichment status: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/watch')
+def watch_status():
+    """Get watch mode status"""
+    try:
+        return jsonify(watcher.status())
+    except Exception as e:
+        logger.error(f"Error getting watch status: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def get_metrics():
+    """Get internal performance metrics"""
+    try:
+        fingerprints = organizer.duplicates.fingerprints
         return jsonify({
-            'total_organized': total_files,
-            'unorganized': unorganized,
-            'category_counts': category_counts,
-            'total_operations': len(organizer.summary)
+            'moves': organizer.mover.metrics(),
+            'fingerprints': fingerprints.stats() if fingerprints else None,
+            'events': events.stats()
         })
+    except Exception as e:
+        logger.error(f"Error getting metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stats')
+def get_stats():
+    """Get organization statistics (cached; ?verify=1 recounts from disk)"""
+    try:
+        if request.args.get('verify', default=False, type=parse_bool):
+            return jsonify(organizer.counters.recount())
+        return jsonify(organizer.counters.snapshot())
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         return jsonify({'error': str(e)}), 500
@@ -375,6 +4015,9 @@ def debug_info():
             'current_working_dir': os.getcwd(),
             'environment_downloads_path': os.getenv('DOWNLOADS_PATH'),
             'summary_file': SUMMARY_FILE,
+            'summary_journal': SUMMARY_JOURNAL_FILE,
+            'history_backend': HISTORY_BACKEND,
+            'history_db': HISTORY_DB_FILE,
             'gemini_configured': model is not None
         }
         
@@ -396,10 +4039,14 @@ if __name__ == '__main__':
     os.makedirs(DOWNLOADS_PATH, exist_ok=True)
     
     # Create category folders
-    for category in FILE_CATEGORIES.keys():
+    for category in category_rules.categories:
         category_path = os.path.join(DOWNLOADS_PATH, category)
         os.makedirs(category_path, exist_ok=True)
         logger.info(f"Created category folder: {category_path}")
     
+    # With the debug reloader, only the child process that serves requests runs background services
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    
     logger.info("Starting Flask application...")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
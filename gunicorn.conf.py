@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for running File Organizer with several worker processes.
+Each setting can be overridden through the environment variables below.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(8, multiprocessing.cpu_count() * 2 + 1))))
+# Threaded workers, so long-lived /events streams and streamed /organize responses don't hold a whole process
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+# Each worker must open its own SQLite connections and locks, so the app is imported after forking
+preload_app = False
+accesslog = '-'
+
+
+def on_starting(server):
+    # The JSONL history keeps entry ids in memory and cannot be shared between processes
+    if workers > 1 and os.getenv('HISTORY_BACKEND', 'sqlite').lower() != 'sqlite':
+        raise RuntimeError('HISTORY_BACKEND must be sqlite when running more than one worker')
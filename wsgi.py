@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers, e.g.:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker process imports this module. They share the SQLite history and job
+state, and only one of them runs the background services (crash recovery, the
+AI description backlog and the watcher).
+"""
+from app import app, start_background_services  # noqa: F401
+
+start_background_services()